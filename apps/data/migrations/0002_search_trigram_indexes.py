@@ -0,0 +1,53 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:23
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+from extensions.models import CREATE_TRIGRAM_EXTENSION
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGRAM_EXTENSION, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='account',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['number'], name='account_number_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='account_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['remark'], name='account_remark_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['number'], name='client_number_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='client_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['remark'], name='client_remark_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['number'], name='supplier_number_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='supplier_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['remark'], name='supplier_remark_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
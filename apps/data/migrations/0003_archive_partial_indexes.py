@@ -0,0 +1,83 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:24
+
+import extensions.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0002_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='account',
+            name='delete_time',
+            field=models.DateTimeField(null=True, verbose_name='删除时间'),
+        ),
+        migrations.AlterField(
+            model_name='account',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='删除状态'),
+        ),
+        migrations.AlterField(
+            model_name='account',
+            name='is_enabled',
+            field=models.BooleanField(default=True, verbose_name='启用状态'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='delete_time',
+            field=models.DateTimeField(null=True, verbose_name='删除时间'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='删除状态'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='is_enabled',
+            field=models.BooleanField(default=True, verbose_name='启用状态'),
+        ),
+        migrations.AlterField(
+            model_name='supplier',
+            name='delete_time',
+            field=models.DateTimeField(null=True, verbose_name='删除时间'),
+        ),
+        migrations.AlterField(
+            model_name='supplier',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='删除状态'),
+        ),
+        migrations.AlterField(
+            model_name='supplier',
+            name='is_enabled',
+            field=models.BooleanField(default=True, verbose_name='启用状态'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=extensions.models.LiveIndex(condition=models.Q(('is_deleted', False)), fields=['is_enabled', '-id'], name='account_live_enabled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=extensions.models.ArchivedIndex(condition=models.Q(('is_deleted', True)), fields=['-delete_time'], name='account_archived_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=extensions.models.LiveIndex(condition=models.Q(('is_deleted', False)), fields=['is_enabled', '-id'], name='client_live_enabled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=extensions.models.ArchivedIndex(condition=models.Q(('is_deleted', True)), fields=['-delete_time'], name='client_archived_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=extensions.models.LiveIndex(condition=models.Q(('is_deleted', False)), fields=['is_enabled', '-id'], name='supplier_live_enabled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=extensions.models.ArchivedIndex(condition=models.Q(('is_deleted', True)), fields=['-delete_time'], name='supplier_archived_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:57
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0003_archive_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='account_name_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='client_name_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='supplier_name_prefix'),
+        ),
+    ]
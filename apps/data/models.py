@@ -2,7 +2,14 @@ from django.db import models
 from django.db.models import Model
 
 from extensions.choices import ClientLevel
-from extensions.models import ArchiveModel, UniqueConstraintEx
+from extensions.models import (
+    ArchivedIndex,
+    ArchiveModel,
+    LiveIndex,
+    UniqueConstraintEx,
+    prefix_index,
+    trigram_index,
+)
 
 
 class Account(ArchiveModel):
@@ -11,20 +18,28 @@ class Account(ArchiveModel):
     number = models.CharField(max_length=20, unique=True, verbose_name='编号')
     name = models.CharField(max_length=60, verbose_name='名称')
     remark = models.CharField(max_length=240, null=True, blank=True, verbose_name='备注')
-    is_enabled = models.BooleanField(default=True, db_index=True, verbose_name='启用状态')
+    is_enabled = models.BooleanField(default=True, verbose_name='启用状态')
 
     initial_balance_amount = models.DecimalField(default=0, max_digits=12, decimal_places=2, verbose_name='初期余额')
     balance_amount = models.DecimalField(default=0, max_digits=12, decimal_places=2, db_index=True, verbose_name='余额')
     extension_data = models.JSONField(default=dict, verbose_name='扩展数据')
     update_time = models.DateTimeField(auto_now=True, db_index=True, verbose_name='修改时间')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
-    is_deleted = models.BooleanField(default=False, db_index=True, verbose_name='删除状态')
-    delete_time = models.DateTimeField(null=True, db_index=True, verbose_name='删除时间')
+    is_deleted = models.BooleanField(default=False, verbose_name='删除状态')
+    delete_time = models.DateTimeField(null=True, verbose_name='删除时间')
 
     class Meta:
         constraints = [
             UniqueConstraintEx(fields=['name', 'delete_time'], name='Account.unique_name'),
         ]
+        indexes = [
+            LiveIndex(fields=['is_enabled', '-id'], name='account_live_enabled_idx'),
+            ArchivedIndex(fields=['-delete_time'], name='account_archived_idx'),
+            trigram_index('number', 'account_number_trgm'),
+            trigram_index('name', 'account_name_trgm'),
+            prefix_index('name', 'account_name_prefix'),
+            trigram_index('remark', 'account_remark_trgm'),
+        ]
 
 
 class SupplierCategory(Model):
@@ -48,20 +63,28 @@ class Supplier(ArchiveModel):
     phone = models.CharField(max_length=20, null=True, blank=True, verbose_name='手机号')
     address = models.CharField(max_length=240, null=True, blank=True, verbose_name='地址')
     remark = models.CharField(max_length=240, null=True, blank=True, verbose_name='备注')
-    is_enabled = models.BooleanField(default=True, db_index=True, verbose_name='启用状态')
+    is_enabled = models.BooleanField(default=True, verbose_name='启用状态')
 
     initial_arrears_amount = models.DecimalField(default=0, max_digits=12, decimal_places=2, verbose_name='初期欠款金额')
     arrears_amount = models.DecimalField(default=0, max_digits=12, decimal_places=2, db_index=True, verbose_name='欠款金额')
     extension_data = models.JSONField(default=dict, verbose_name='扩展数据')
     update_time = models.DateTimeField(auto_now=True, db_index=True, verbose_name='修改时间')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
-    is_deleted = models.BooleanField(default=False, db_index=True, verbose_name='删除状态')
-    delete_time = models.DateTimeField(null=True, db_index=True, verbose_name='删除时间')
+    is_deleted = models.BooleanField(default=False, verbose_name='删除状态')
+    delete_time = models.DateTimeField(null=True, verbose_name='删除时间')
 
     class Meta:
         constraints = [
             UniqueConstraintEx(fields=['name', 'delete_time'], name='Supplier.unique_name'),
         ]
+        indexes = [
+            LiveIndex(fields=['is_enabled', '-id'], name='supplier_live_enabled_idx'),
+            ArchivedIndex(fields=['-delete_time'], name='supplier_archived_idx'),
+            trigram_index('number', 'supplier_number_trgm'),
+            trigram_index('name', 'supplier_name_trgm'),
+            prefix_index('name', 'supplier_name_prefix'),
+            trigram_index('remark', 'supplier_remark_trgm'),
+        ]
 
 
 class ClientCategory(Model):
@@ -87,20 +110,28 @@ class Client(ArchiveModel):
     phone = models.CharField(max_length=20, null=True, blank=True, verbose_name='手机号')
     address = models.CharField(max_length=240, null=True, blank=True, verbose_name='地址')
     remark = models.CharField(max_length=240, null=True, blank=True, verbose_name='备注')
-    is_enabled = models.BooleanField(default=True, db_index=True, verbose_name='启用状态')
+    is_enabled = models.BooleanField(default=True, verbose_name='启用状态')
 
     initial_arrears_amount = models.DecimalField(default=0, max_digits=12, decimal_places=2, verbose_name='初期欠款金额')
     arrears_amount = models.DecimalField(default=0, max_digits=12, decimal_places=2, db_index=True, verbose_name='欠款金额')
     extension_data = models.JSONField(default=dict, verbose_name='扩展数据')
     update_time = models.DateTimeField(auto_now=True, db_index=True, verbose_name='修改时间')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
-    is_deleted = models.BooleanField(default=False, db_index=True, verbose_name='删除状态')
-    delete_time = models.DateTimeField(null=True, db_index=True, verbose_name='删除时间')
+    is_deleted = models.BooleanField(default=False, verbose_name='删除状态')
+    delete_time = models.DateTimeField(null=True, verbose_name='删除时间')
 
     class Meta:
         constraints = [
             UniqueConstraintEx(fields=['name', 'delete_time'], name='Client.unique_name'),
         ]
+        indexes = [
+            LiveIndex(fields=['is_enabled', '-id'], name='client_live_enabled_idx'),
+            ArchivedIndex(fields=['-delete_time'], name='client_archived_idx'),
+            trigram_index('number', 'client_number_trgm'),
+            trigram_index('name', 'client_name_trgm'),
+            prefix_index('name', 'client_name_prefix'),
+            trigram_index('remark', 'client_remark_trgm'),
+        ]
 
 
 class ProductCategory(Model):
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 
 from apps.data.models import *
-from apps.system.models import ModelField
+from apps.system.models import ModelField, NumberRegistry
 from extensions.exceptions import ValidationError
 from extensions.field_configs import validate_custom_data
 from extensions.serializers import ModelSerializerEx
@@ -23,8 +23,7 @@ class AccountSerializer(ModelSerializerEx):
         return super().validate(attrs)
 
     def create(self, validated_data):
-        total_count = Account.objects.all().count() + 1
-        validated_data['number'] = f'A{total_count:03d}'
+        validated_data['number'] = NumberRegistry.generate_serial_number('A', NumberRegistry.DataModel.ACCOUNT)
         return super().create(validated_data)
 
 
@@ -26,7 +26,7 @@ class UserOptionViewSet(ListViewSet):
     permission_classes = [IsAuthenticated, UserOptionPermission]
     filterset_fields = ['is_enabled']
     ordering = ['name']
-    queryset = User.objects.filter(is_deleted=False)
+    queryset = User.live.all()
 
 
 class WarehouseOptionViewSet(ListViewSet):
@@ -0,0 +1,26 @@
+from django.db.models import TextChoices
+
+from extensions.consumers import AsyncJsonWebsocketConsumerEx
+
+
+class InventoryProvisionConsumer(AsyncJsonWebsocketConsumerEx):
+    """库存初始化进度(后台任务)"""
+
+    consumer_code = 'inventory_provision'
+
+    class ProvisionStatus(TextChoices):
+        """初始化状态"""
+
+        PROVISIONING = ('provisioning', '初始化中')
+        COMPLETED = ('completed', '已完成')
+        FAILED = ('failed', '失败')
+
+    async def handle_event(self, event):
+        data = event['data']
+        is_close = data['provision_status'] != self.ProvisionStatus.PROVISIONING
+        await self.send_json({'status_code': 200, 'data': data}, is_close)
+
+
+__all__ = [
+    'InventoryProvisionConsumer',
+]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:23
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+from extensions.models import CREATE_TRIGRAM_EXTENSION
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0002_search_trigram_indexes'),
+        ('product', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGRAM_EXTENSION, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['number'], name='product_number_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='product_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['barcode'], name='product_barcode_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['remark'], name='product_remark_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
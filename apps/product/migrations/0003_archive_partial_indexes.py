@@ -0,0 +1,76 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:24
+
+import extensions.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0003_archive_partial_indexes'),
+        ('product', '0002_search_trigram_indexes'),
+        ('system', '0004_archive_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='batch',
+            name='has_stock',
+            field=models.BooleanField(default=False, verbose_name='库存状态'),
+        ),
+        migrations.AlterField(
+            model_name='inventory',
+            name='enable_warning',
+            field=models.BooleanField(default=False, verbose_name='预警启用状态'),
+        ),
+        migrations.AlterField(
+            model_name='inventory',
+            name='has_stock',
+            field=models.BooleanField(default=False, verbose_name='库存状态'),
+        ),
+        migrations.AlterField(
+            model_name='inventory',
+            name='is_on_sale',
+            field=models.BooleanField(default=True, verbose_name='在售状态'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='delete_time',
+            field=models.DateTimeField(null=True, verbose_name='删除时间'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='enable_batch_control',
+            field=models.BooleanField(default=False, verbose_name='批次控制'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='删除状态'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='is_enabled',
+            field=models.BooleanField(default=True, verbose_name='启用状态'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(condition=models.Q(('has_stock', True)), fields=['inventory', 'expiry_date'], name='batch_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('has_stock', True)), fields=['warehouse', 'product'], name='inventory_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('enable_warning', True)), fields=['warehouse', 'total_quantity'], name='inventory_warning_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=extensions.models.LiveIndex(condition=models.Q(('is_deleted', False)), fields=['is_enabled', '-id'], name='product_live_enabled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=extensions.models.ArchivedIndex(condition=models.Q(('is_deleted', True)), fields=['-delete_time'], name='product_archived_idx'),
+        ),
+    ]
@@ -1,7 +1,14 @@
 from django.db import models
-from django.db.models import Model
+from django.db.models import Index, Model, Q
 
-from extensions.models import ArchiveModel, UniqueConstraintEx
+from extensions.models import (
+    ArchivedIndex,
+    ArchiveModel,
+    LiveIndex,
+    UniqueConstraintEx,
+    prefix_index,
+    trigram_index,
+)
 
 
 class Product(ArchiveModel):
@@ -19,22 +26,31 @@ class Product(ArchiveModel):
         'data.Brand', on_delete=models.SET_NULL, null=True, related_name='product_set', verbose_name='品牌')
     unit = models.CharField(max_length=20, null=True, blank=True, verbose_name='单位')
     remark = models.CharField(max_length=240, null=True, blank=True, verbose_name='备注')
-    is_enabled = models.BooleanField(default=True, db_index=True, verbose_name='启用状态')
+    is_enabled = models.BooleanField(default=True, verbose_name='启用状态')
 
     supplier_set = models.ManyToManyField('data.Supplier', blank=True, related_name='product_set', verbose_name='供应商')
-    enable_batch_control = models.BooleanField(default=False, db_index=True, verbose_name='批次控制')
+    enable_batch_control = models.BooleanField(default=False, verbose_name='批次控制')
     expiration_days = models.IntegerField(null=True, verbose_name='有效期天数')
     expiration_warning_days = models.IntegerField(null=True, verbose_name='有效期预警天数')
     extension_data = models.JSONField(default=dict, verbose_name='扩展数据')
     update_time = models.DateTimeField(auto_now=True, db_index=True, verbose_name='修改时间')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
-    is_deleted = models.BooleanField(default=False, db_index=True, verbose_name='删除状态')
-    delete_time = models.DateTimeField(null=True, db_index=True, verbose_name='删除时间')
+    is_deleted = models.BooleanField(default=False, verbose_name='删除状态')
+    delete_time = models.DateTimeField(null=True, verbose_name='删除时间')
 
     class Meta:
         constraints = [
             UniqueConstraintEx(fields=['name', 'spec', 'delete_time'], name='product'),
         ]
+        indexes = [
+            LiveIndex(fields=['is_enabled', '-id'], name='product_live_enabled_idx'),
+            ArchivedIndex(fields=['-delete_time'], name='product_archived_idx'),
+            trigram_index('number', 'product_number_trgm'),
+            trigram_index('name', 'product_name_trgm'),
+            prefix_index('name', 'product_name_prefix'),
+            trigram_index('barcode', 'product_barcode_trgm'),
+            trigram_index('remark', 'product_remark_trgm'),
+        ]
 
 
 class ProductImage(Model):
@@ -59,9 +75,9 @@ class Inventory(Model):
     level_price2 = models.FloatField(null=True, verbose_name='等级价二')
     level_price3 = models.FloatField(null=True, verbose_name='等级价三')
     total_quantity = models.FloatField(default=0, db_index=True, verbose_name='库存数量')
-    has_stock = models.BooleanField(default=False, db_index=True, verbose_name='库存状态')
-    is_on_sale = models.BooleanField(default=True, db_index=True, verbose_name='在售状态')
-    enable_warning = models.BooleanField(default=False, db_index=True, verbose_name='预警启用状态')
+    has_stock = models.BooleanField(default=False, verbose_name='库存状态')
+    is_on_sale = models.BooleanField(default=True, verbose_name='在售状态')
+    enable_warning = models.BooleanField(default=False, verbose_name='预警启用状态')
     min_quantity = models.FloatField(null=True, verbose_name='最小数量')
     max_quantity = models.FloatField(null=True, verbose_name='最大数量')
 
@@ -69,6 +85,10 @@ class Inventory(Model):
         constraints = [
             UniqueConstraintEx(fields=['warehouse', 'product'], name='inventory'),
         ]
+        indexes = [
+            Index(fields=['warehouse', 'product'], condition=Q(has_stock=True), name='inventory_in_stock_idx'),
+            Index(fields=['warehouse', 'total_quantity'], condition=Q(enable_warning=True), name='inventory_warning_idx'),
+        ]
 
 
 class Batch(Model):
@@ -82,7 +102,7 @@ class Batch(Model):
     product = models.ForeignKey(
         'product.Product', on_delete=models.CASCADE, related_name='batch_set', verbose_name='产品')
     total_quantity = models.FloatField(default=0, db_index=True, verbose_name='库存数量')
-    has_stock = models.BooleanField(default=False, db_index=True, verbose_name='库存状态')
+    has_stock = models.BooleanField(default=False, verbose_name='库存状态')
     production_date = models.DateField(null=True, db_index=True, verbose_name='生产日期')
     warning_date = models.DateField(null=True, db_index=True, verbose_name='预警日期')
     expiry_date = models.DateField(null=True, db_index=True, verbose_name='到期日期')
@@ -92,6 +112,9 @@ class Batch(Model):
         constraints = [
             UniqueConstraintEx(fields=['number', 'inventory', 'production_date'], name='batch'),
         ]
+        indexes = [
+            Index(fields=['inventory', 'expiry_date'], condition=Q(has_stock=True), name='batch_in_stock_idx'),
+        ]
 
 
 __all__ = [
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.product.models import Product
+from apps.product.tasks import provision_inventory
+
+
+@receiver(post_save, sender=Product)
+def provision_product_inventory(sender, instance, created, **kwargs):
+    # 新建产品在所有仓库中生成库存, 仓库数量有限, 直接执行
+    if created:
+        provision_inventory(product_ids=[instance.id])
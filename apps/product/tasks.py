@@ -0,0 +1,119 @@
+from celery import shared_task
+from django.db import connection, transaction
+from django_tenants.utils import tenant_context
+
+from apps.product.consumers import InventoryProvisionConsumer
+from apps.product.models import Inventory, Product
+from apps.system.models import User, Warehouse
+from apps.tenant.models import ErrorLog, Tenant
+from extensions.progress import ProgressReporter
+
+PROVISION_BATCH_SIZE = 20000
+PROVISION_BACKGROUND_THRESHOLD = 20000
+
+
+def provision_inventory(warehouse_ids=None, product_ids=None, batch_size=PROVISION_BATCH_SIZE, progress_callback=None):
+    """补齐仓库 × 产品的库存记录, 返回新建条数
+
+    使用 INSERT ... SELECT ... ON CONFLICT DO NOTHING 在数据库中生成库存, 已存在的库存不受影响;
+    warehouse_ids / product_ids 为 None 时表示全部仓库 / 产品. 按产品 ID 范围分批, 每批一条语句,
+    progress_callback(已处理产品数, 产品总数) 在每批完成后调用.
+    """
+
+    quote_name = connection.ops.quote_name
+    inventory_meta = Inventory._meta
+    column_list = [quote_name(inventory_meta.get_field('warehouse').column),
+                   quote_name(inventory_meta.get_field('product').column)]
+    default_list = []
+    for field in inventory_meta.concrete_fields:
+        if field.primary_key or field.name in ('warehouse', 'product'):
+            continue
+
+        column_list.append(quote_name(field.column))
+        default_list.append(field.get_db_prep_save(field.get_default(), connection))
+
+    condition_list = ['p.id > %s', 'p.id <= %s']
+    condition_params = []
+    if product_ids is not None:
+        condition_list.append('p.id = ANY(%s)')
+        condition_params.append(list(product_ids))
+    if warehouse_ids is not None:
+        condition_list.append('w.id = ANY(%s)')
+        condition_params.append(list(warehouse_ids))
+
+    sql = f"""
+        INSERT INTO {quote_name(inventory_meta.db_table)} ({', '.join(column_list)})
+        SELECT w.id, p.id, {', '.join(['%s'] * len(default_list))}
+        FROM {quote_name(Product._meta.db_table)} p
+        CROSS JOIN {quote_name(Warehouse._meta.db_table)} w
+        WHERE {' AND '.join(condition_list)}
+        ON CONFLICT DO NOTHING
+    """
+
+    product_set = Product.objects.all() if product_ids is None else Product.objects.filter(id__any=list(product_ids))
+    product_set = product_set.order_by('id').values_list('id', flat=True)
+    total_count = product_set.count()
+    completed_count = 0
+    created_count = 0
+    last_id = 0
+    with connection.cursor() as cursor:
+        while True:
+            # 本批产品 ID 上界, 沿主键索引定位, 不把产品 ID 读入内存
+            if (max_id := product_set.filter(id__gt=last_id)[batch_size - 1:batch_size].first()) is None:
+                max_id = product_set.filter(id__gt=last_id).last()
+                if max_id is None:
+                    break
+
+            cursor.execute(sql, [*default_list, last_id, max_id, *condition_params])
+            created_count += cursor.rowcount
+            completed_count = min(completed_count + batch_size, total_count)
+            last_id = max_id
+
+            if progress_callback is not None:
+                progress_callback(completed_count, total_count)
+
+    return created_count
+
+
+def propagate_inventory(user, warehouse_ids=None, product_ids=None):
+    """补齐库存, 产品数量较多时提交后转为后台任务(InventoryProvisionConsumer 上报进度)"""
+
+    product_count = Product.objects.count() if product_ids is None else len(product_ids)
+    if product_count <= PROVISION_BACKGROUND_THRESHOLD:
+        return provision_inventory(warehouse_ids, product_ids)
+
+    tenant_id = connection.tenant.id
+    warehouse_ids = None if warehouse_ids is None else list(warehouse_ids)
+    product_ids = None if product_ids is None else list(product_ids)
+    transaction.on_commit(lambda: provision_inventory_task.delay(tenant_id, user.id, warehouse_ids, product_ids))
+    return None
+
+
+@shared_task
+def provision_inventory_task(tenant_id, user_id, warehouse_ids=None, product_ids=None):
+    tenant = Tenant.objects.get(id=tenant_id)
+    with tenant_context(tenant):
+        ProvisionStatus = InventoryProvisionConsumer.ProvisionStatus
+        progress_reporter = ProgressReporter(InventoryProvisionConsumer, User.objects.get(id=user_id))
+        progress = {'provision_status': ProvisionStatus.PROVISIONING, 'total_count': 0, 'completed_count': 0}
+
+        def report_progress(completed_count, total_count):
+            progress.update(total_count=total_count, completed_count=completed_count)
+            progress_reporter.update(dict(progress))
+
+        try:
+            # 自动提交模式下每批单独提交, 失败时已完成的批次保留, 重新执行时跳过已存在的库存
+            provision_inventory(warehouse_ids, product_ids, progress_callback=report_progress)
+            progress['provision_status'] = ProvisionStatus.COMPLETED
+        except Exception as error:
+            progress['provision_status'] = ProvisionStatus.FAILED
+            ErrorLog.objects.create(module='库存初始化', content=str(error))
+
+        progress_reporter.send(progress)
+
+
+__all__ = [
+    'provision_inventory',
+    'propagate_inventory',
+    'provision_inventory_task',
+]
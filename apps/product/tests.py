@@ -1,3 +1,55 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+
+from apps.product.models import Inventory, Product
+from apps.product.tasks import provision_inventory
+from apps.system.models import Warehouse
+
+
+class ProvisionInventoryTestCase(TenantTestCase):
+    """库存初始化: 分批补齐仓库 × 产品的库存记录, 已存在的库存不受影响"""
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.number = 'test'
+        tenant.expiry_time = timezone.now() + timedelta(days=365)
+
+    def setUp(self):
+        self.warehouse_ids = [Warehouse.objects.create(number=f'PW{index:03}', name=f'库存仓库{index}').id
+                              for index in range(2)]
+        # 新建产品时在所有仓库中生成库存(post_save 信号)
+        self.product_ids = [
+            Product.objects.create(number=f'PP{index:03}', name=f'库存产品{index}', barcode=f'B{index}').id
+            for index in range(5)
+        ]
+        self.inventory_set = Inventory.objects.filter(warehouse__in=self.warehouse_ids, product__in=self.product_ids)
+
+    def test_provision(self):
+        self.assertEqual(self.inventory_set.count(), 10)
+
+        kept_inventory = self.inventory_set.filter(warehouse=self.warehouse_ids[0], product=self.product_ids[0]).get()
+        kept_inventory.total_quantity = 5
+        kept_inventory.save(update_fields=['total_quantity'])
+        self.inventory_set.exclude(id=kept_inventory.id).filter(product__in=self.product_ids[:3]).delete()
+
+        progress_list = []
+        created_count = provision_inventory(self.warehouse_ids, self.product_ids, batch_size=2,
+                                            progress_callback=lambda *progress: progress_list.append(progress))
+        self.assertEqual(created_count, 5)
+        self.assertEqual(progress_list, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(self.inventory_set.count(), 10)
+
+        # 已存在的库存冲突时跳过, 不覆盖
+        kept_inventory.refresh_from_db()
+        self.assertEqual(kept_inventory.total_quantity, 5)
+
+        self.assertEqual(provision_inventory(self.warehouse_ids, self.product_ids, batch_size=2), 0)
+
+    def test_warehouse_filter(self):
+        self.inventory_set.delete()
+
+        created_count = provision_inventory([self.warehouse_ids[0]], self.product_ids)
+        self.assertEqual(created_count, 5)
+        self.assertEqual(set(self.inventory_set.values_list('warehouse', flat=True)), {self.warehouse_ids[0]})
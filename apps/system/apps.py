@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.utils.module_loading import autodiscover_modules
 
 
 class SystemConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.system'
+
+    def ready(self):
+        from apps.system import signals
+        from extensions.permissions import check_permission_codes
+
+        # 加载所有 permissions.py 以注册权限代码
+        autodiscover_modules('permissions')
+        checks.register(check_permission_codes)
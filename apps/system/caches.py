@@ -0,0 +1,51 @@
+import copy
+
+from django.db import connection, transaction
+
+from apps.system.models import User
+from extensions.caches import TieredCache
+from extensions.permissions import permission_registry
+
+user_cache = TieredCache('user', max_size=4096)
+
+
+def get_user_key(user_id):
+    # 快照中包含权限位掩码, 位分配随权限代码变化, 因此键中包含注册表版本
+    return f'{connection.schema_name}:{user_id}:{permission_registry.version}'
+
+
+def get_cached_user(user_id):
+    """获取用户快照, 未命中时查询数据库"""
+
+    def load_user():
+        # 密码哈希不进入共享缓存, 需要时按需查询
+        user = User.live.defer('password').get(id=user_id)
+        user.permission_mask  # 预先编译权限位掩码, 随快照一起缓存
+        user.warehouse_ids  # 预先查询授权仓库, 随快照一起缓存
+        return user
+
+    user = user_cache.get_or_set(get_user_key(user_id), load_user)
+
+    # 返回副本, 避免请求中的修改污染缓存; 权限列表可变, 单独复制
+    user = copy.copy(user)
+    user.permissions = list(user.permissions)
+    return user
+
+
+def invalidate_user(*user_ids):
+    """事务提交后失效用户快照"""
+
+    key_list = [get_user_key(user_id) for user_id in user_ids]
+
+    def delete_keys():
+        for key in key_list:
+            user_cache.delete(key)
+
+    if key_list:
+        transaction.on_commit(delete_keys)
+
+
+__all__ = [
+    'get_cached_user',
+    'invalidate_user',
+]
@@ -1,19 +1,52 @@
-from apps.system.models import Notification
+from channels.layers import get_channel_layer
+
+from apps.system.models import User
 from extensions.consumers import AsyncJsonWebsocketConsumerEx
 
 
 class NotificationConsumer(AsyncJsonWebsocketConsumerEx):
+    """通知推送, 事件数据为 {'unread_count': 最新未读数量, 'notification_items': 新通知列表}
+
+    接收人较少时逐个发送到用户组; 接收人较多时分批向租户组播组发送, 组播数据为 {用户 ID: 事件数据},
+    各连接只取出自己的数据转发, 不查询数据库.
+    """
+
     consumer_code = 'notification'
 
+    @staticmethod
+    def get_multicast_group_name(schema_name):
+        return f'notification_multicast.{schema_name}'
+
+    def get_group_names(self):
+        return [*super().get_group_names(), self.get_multicast_group_name(self.tenant.schema_name)]
+
     async def init_data(self):
-        await self.handle_event({'data': []})
+        unread_count = await User.objects.filter(id=self.user.id).values_list(
+            'unread_notification_count', flat=True).afirst()
+        await self.handle_event({'data': {'unread_count': unread_count or 0, 'notification_items': []}})
 
     async def handle_event(self, event):
-        unread_count = await Notification.objects.filter(notifier=self.user, is_read=False).acount()
-        await self.send_json({'status_code': 200, 'data': {
-            'unread_count': unread_count,
-            'notification_items': event['data'],
-        }})
+        await self.send_json({'status_code': 200, 'data': event['data']})
+
+    async def handle_multicast(self, event):
+        if (data := event['data'].get(str(self.user.id))) is not None:
+            await self.handle_event({'data': data})
+
+    @classmethod
+    async def send_unicast(cls, data_map):
+        """逐个向用户组发送, data_map 为 {用户 ID(字符串): 事件数据}"""
+
+        channel_layer = get_channel_layer()
+        for user_id, data in data_map.items():
+            await channel_layer.group_send(f'{cls.consumer_code}.{user_id}', {'type': 'handle.event', 'data': data})
+
+    @classmethod
+    async def send_multicast(cls, schema_name, data_map):
+        """向租户组播组发送一次, data_map 为 {用户 ID(字符串): 事件数据}"""
+
+        channel_layer = get_channel_layer()
+        await channel_layer.group_send(
+            cls.get_multicast_group_name(schema_name), {'type': 'handle.multicast', 'data': data_map})
 
 
 __all__ = [
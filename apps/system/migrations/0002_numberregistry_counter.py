@@ -0,0 +1,84 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def seed_number_registry(apps, schema_editor):
+    NumberRegistry = apps.get_model('system', 'NumberRegistry')
+    User = apps.get_model('system', 'User')
+    Warehouse = apps.get_model('system', 'Warehouse')
+    ModelField = apps.get_model('system', 'ModelField')
+    Account = apps.get_model('data', 'Account')
+
+    # 按日编号: 将原有编号记录汇总为每日计数
+    daily_count_list = list(
+        NumberRegistry.objects
+        .annotate(date=TruncDate('create_time', tzinfo=timezone.get_current_timezone()))
+        .values('model', 'date')
+        .annotate(count=Count('id'))
+    )
+    NumberRegistry.objects.all().delete()
+
+    registry_list = [
+        NumberRegistry(key=f'{item["model"]}.{item["date"].strftime("%Y%m%d")}', model=item['model'],
+                       value=item['count'])
+        for item in daily_count_list
+    ]
+
+    # 流水编号: 与原 count() + 1 规则保持一致
+    for model, model_class in [('user', User), ('warehouse', Warehouse), ('model_field', ModelField),
+                               ('account', Account)]:
+        registry_list.append(NumberRegistry(key=model, model=model, value=model_class.objects.count()))
+
+    NumberRegistry.objects.bulk_create(registry_list)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0001_initial'),
+        ('system', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='numberregistry',
+            name='key',
+            field=models.CharField(max_length=60, null=True, verbose_name='键'),
+        ),
+        migrations.AddField(
+            model_name='numberregistry',
+            name='value',
+            field=models.BigIntegerField(default=0, verbose_name='序号'),
+        ),
+        migrations.AddField(
+            model_name='numberregistry',
+            name='update_time',
+            field=models.DateTimeField(auto_now=True, verbose_name='修改时间'),
+        ),
+        migrations.AlterField(
+            model_name='numberregistry',
+            name='number',
+            field=models.CharField(max_length=20, null=True, verbose_name='编号'),
+        ),
+        migrations.AlterField(
+            model_name='numberregistry',
+            name='model',
+            field=models.CharField(choices=[('export_task', '导出任务'), ('import_task', '导入任务'), ('user', '员工账号'), ('warehouse', '仓库管理'), ('model_field', '模型字段'), ('account', '结算账户')], db_index=True, max_length=20, verbose_name='模型'),
+        ),
+        migrations.RunPython(seed_number_registry, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='numberregistry',
+            name='number',
+        ),
+        migrations.RemoveField(
+            model_name='numberregistry',
+            name='create_time',
+        ),
+        migrations.AlterField(
+            model_name='numberregistry',
+            name='key',
+            field=models.CharField(max_length=60, unique=True, verbose_name='键'),
+        ),
+    ]
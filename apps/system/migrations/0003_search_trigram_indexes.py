@@ -0,0 +1,45 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:23
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+from extensions.models import CREATE_TRIGRAM_EXTENSION
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0002_numberregistry_counter'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGRAM_EXTENSION, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['number'], name='user_number_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['username'], name='user_username_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='user_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['remark'], name='user_remark_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='warehouse',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['number'], name='warehouse_number_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='warehouse',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='warehouse_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='warehouse',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['remark'], name='warehouse_remark_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
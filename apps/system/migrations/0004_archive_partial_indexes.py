@@ -0,0 +1,92 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:24
+
+import extensions.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0003_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='modelfield',
+            name='delete_time',
+            field=models.DateTimeField(null=True, verbose_name='删除时间'),
+        ),
+        migrations.AlterField(
+            model_name='modelfield',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='删除状态'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='is_read',
+            field=models.BooleanField(default=False, verbose_name='已读状态'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='delete_time',
+            field=models.DateTimeField(null=True, verbose_name='删除时间'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='删除状态'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='is_enabled',
+            field=models.BooleanField(default=True, verbose_name='启用状态'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='delete_time',
+            field=models.DateTimeField(null=True, verbose_name='删除时间'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='删除状态'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='is_enabled',
+            field=models.BooleanField(default=True, verbose_name='启用状态'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='is_locked',
+            field=models.BooleanField(default=False, verbose_name='锁定状态'),
+        ),
+        migrations.AddIndex(
+            model_name='modelfield',
+            index=extensions.models.LiveIndex(condition=models.Q(('is_deleted', False)), fields=['model', '-priority', 'id'], name='modelfield_live_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='modelfield',
+            index=extensions.models.ArchivedIndex(condition=models.Q(('is_deleted', True)), fields=['-delete_time'], name='modelfield_archived_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['notifier'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=extensions.models.LiveIndex(condition=models.Q(('is_deleted', False)), fields=['is_enabled', '-id'], name='user_live_enabled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=extensions.models.ArchivedIndex(condition=models.Q(('is_deleted', True)), fields=['-delete_time'], name='user_archived_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='warehouse',
+            index=extensions.models.LiveIndex(condition=models.Q(('is_deleted', False)), fields=['is_enabled', '-id'], name='warehouse_live_enabled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='warehouse',
+            index=extensions.models.ArchivedIndex(condition=models.Q(('is_deleted', True)), fields=['-delete_time'], name='warehouse_archived_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0004_archive_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notification_count',
+            field=models.IntegerField(default=0, verbose_name='未读通知数量'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE "system_user" u SET unread_notification_count = n.unread_count
+            FROM (
+                SELECT notifier_id, COUNT(*) AS unread_count FROM "system_notification"
+                WHERE NOT is_read GROUP BY notifier_id
+            ) n
+            WHERE u.id = n.notifier_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0005_user_unread_notification_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='digest_count',
+            field=models.IntegerField(default=1, verbose_name='合并数量'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='digest_key',
+            field=models.CharField(blank=True, max_length=60, null=True, verbose_name='合并标识'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('digest_key__isnull', False), ('is_read', False)), fields=['notifier', 'digest_key'], name='notification_digest_idx'),
+        ),
+    ]
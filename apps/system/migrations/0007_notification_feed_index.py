@@ -0,0 +1,17 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0006_notification_digest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['notifier', '-create_time', '-id'], name='notification_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:57
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('system', '0007_notification_feed_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='user_name_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='warehouse',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='warehouse_name_prefix'),
+        ),
+    ]
@@ -1,9 +1,20 @@
-from django.db import models
-from django.db.models import Model
+import json
+from collections import Counter
+
+from django.db import connection, models, transaction
+from django.db.models import Index, Manager, Model, Q, QuerySet
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 from extensions.exceptions import ValidationError
-from extensions.models import ArchiveModel, UniqueConstraintEx
+from extensions.models import (
+    ArchivedIndex,
+    ArchiveModel,
+    LiveIndex,
+    UniqueConstraintEx,
+    prefix_index,
+    trigram_index,
+)
 
 
 class Role(Model):
@@ -30,23 +41,78 @@ class User(ArchiveModel):
     permissions = models.JSONField(default=list, verbose_name='权限')
     remark = models.CharField(max_length=240, null=True, blank=True, verbose_name='备注')
     is_manager = models.BooleanField(default=False, verbose_name='管理员状态')
-    is_enabled = models.BooleanField(default=True, db_index=True, verbose_name='启用状态')
+    is_enabled = models.BooleanField(default=True, verbose_name='启用状态')
+    unread_notification_count = models.IntegerField(default=0, verbose_name='未读通知数量')
     extension_data = models.JSONField(default=dict, verbose_name='扩展数据')
     update_time = models.DateTimeField(auto_now=True, db_index=True, verbose_name='修改时间')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
-    is_deleted = models.BooleanField(default=False, db_index=True, verbose_name='删除状态')
-    delete_time = models.DateTimeField(null=True, db_index=True, verbose_name='删除时间')
+    is_deleted = models.BooleanField(default=False, verbose_name='删除状态')
+    delete_time = models.DateTimeField(null=True, verbose_name='删除时间')
 
     class Meta:
         constraints = [
             UniqueConstraintEx(fields=['username', 'delete_time'], name='User.unique_username'),
             UniqueConstraintEx(fields=['name', 'delete_time'], name='User.unique_name'),
         ]
+        indexes = [
+            LiveIndex(fields=['is_enabled', '-id'], name='user_live_enabled_idx'),
+            ArchivedIndex(fields=['-delete_time'], name='user_archived_idx'),
+            trigram_index('number', 'user_number_trgm'),
+            trigram_index('username', 'user_username_trgm'),
+            trigram_index('name', 'user_name_trgm'),
+            prefix_index('name', 'user_name_prefix'),
+            trigram_index('remark', 'user_remark_trgm'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # 未读通知数量只在数据库中增减, 整行保存时不写回实例中可能过期的值; 延迟加载的字段(缓存快照中的密码)不写回
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred_fields = self.get_deferred_fields()
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'unread_notification_count'
+                                       and field.attname not in deferred_fields]
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def adjust_unread_notification_count(cls, delta_map):
+        """按 {用户 ID: 增减数量} 更新未读通知数量, 一条语句完成, 返回 {用户 ID: 最新未读数量}"""
+
+        delta_map = {user_id: delta for user_id, delta in delta_map.items() if delta}
+        if not delta_map:
+            return {}
+
+        user_table = connection.ops.quote_name(cls._meta.db_table)
+        count_column = connection.ops.quote_name(cls._meta.get_field('unread_notification_count').column)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE {user_table} u SET {count_column} = GREATEST(u.{count_column} + d.delta, 0)
+                FROM unnest(%s::bigint[], %s::integer[]) AS d(id, delta)
+                WHERE u.id = d.id
+                RETURNING u.id, u.{count_column}
+            """, [list(delta_map.keys()), list(delta_map.values())])
+            return dict(cursor.fetchall())
+
+    @cached_property
+    def permission_mask(self):
+        from extensions.permissions import permission_registry
+
+        return permission_registry.compile(self.permissions)
+
+    @cached_property
+    def warehouse_ids(self):
+        """授权仓库(未删除) ID 集合, 随用户快照一起缓存, 由用户缓存的失效信号保持同步"""
 
-    def get_warehouse_set(self):
         if self.is_manager:
-            return Warehouse.objects.filter(is_deleted=False)
-        return self.warehouse_set.filter(is_deleted=False)
+            return frozenset(Warehouse.live.values_list('id', flat=True))
+        return frozenset(self.warehouse_set(manager='live').values_list('id', flat=True))
+
+    def get_warehouse_set(self):
+        return Warehouse.objects.filter(id__any=sorted(self.warehouse_ids))
+
+    def filter_warehouse_scope(self, queryset, field='warehouse'):
+        """按授权仓库过滤查询集(field_id = ANY(...)), 不关联用户仓库表"""
+
+        return queryset.filter(**{f'{field}_id__any': sorted(self.warehouse_ids)})
 
 
 class Warehouse(ArchiveModel):
@@ -56,18 +122,26 @@ class Warehouse(ArchiveModel):
     name = models.CharField(max_length=60, verbose_name='名称')
     address = models.CharField(max_length=240, null=True, blank=True, verbose_name='地址')
     remark = models.CharField(max_length=240, null=True, blank=True, verbose_name='备注')
-    is_locked = models.BooleanField(default=False, db_index=True, verbose_name='锁定状态')
-    is_enabled = models.BooleanField(default=True, db_index=True, verbose_name='启用状态')
+    is_locked = models.BooleanField(default=False, verbose_name='锁定状态')
+    is_enabled = models.BooleanField(default=True, verbose_name='启用状态')
     extension_data = models.JSONField(default=dict, verbose_name='扩展数据')
     update_time = models.DateTimeField(auto_now=True, db_index=True, verbose_name='修改时间')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
-    is_deleted = models.BooleanField(default=False, db_index=True, verbose_name='删除状态')
-    delete_time = models.DateTimeField(null=True, db_index=True, verbose_name='删除时间')
+    is_deleted = models.BooleanField(default=False, verbose_name='删除状态')
+    delete_time = models.DateTimeField(null=True, verbose_name='删除时间')
 
     class Meta:
         constraints = [
             UniqueConstraintEx(fields=['name', 'delete_time'], name='Warehouse.unique_name'),
         ]
+        indexes = [
+            LiveIndex(fields=['is_enabled', '-id'], name='warehouse_live_enabled_idx'),
+            ArchivedIndex(fields=['-delete_time'], name='warehouse_archived_idx'),
+            trigram_index('number', 'warehouse_number_trgm'),
+            trigram_index('name', 'warehouse_name_trgm'),
+            prefix_index('name', 'warehouse_name_prefix'),
+            trigram_index('remark', 'warehouse_remark_trgm'),
+        ]
 
 
 class ModelField(ArchiveModel):
@@ -110,18 +184,89 @@ class ModelField(ArchiveModel):
     source = models.CharField(max_length=20, choices=Source.choices, default=Source.CUSTOM, verbose_name='来源')
     update_time = models.DateTimeField(auto_now=True, db_index=True, verbose_name='修改时间')
     create_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
-    is_deleted = models.BooleanField(default=False, db_index=True, verbose_name='删除状态')
-    delete_time = models.DateTimeField(null=True, db_index=True, verbose_name='删除时间')
+    is_deleted = models.BooleanField(default=False, verbose_name='删除状态')
+    delete_time = models.DateTimeField(null=True, verbose_name='删除时间')
 
     class Meta:
         constraints = [
             UniqueConstraintEx(fields=['name', 'model', 'delete_time'], name='ModelField.unique_name_model'),
             UniqueConstraintEx(fields=['code', 'model'], name='ModelField.unique_code_model'),
         ]
+        indexes = [
+            LiveIndex(fields=['model', '-priority', 'id'], name='modelfield_live_model_idx'),
+            ArchivedIndex(fields=['-delete_time'], name='modelfield_archived_idx'),
+        ]
+
+
+class NotificationQuerySet(QuerySet):
+    """通知查询集, 修改已读状态和删除通知时在同一条语句中同步通知人的未读通知数量"""
+
+    def execute_with_unread_count(self, statement, params):
+        """执行修改通知的语句(RETURNING notifier_id, delta), 返回 (修改条数, {通知人 ID: 最新未读数量})"""
+
+        user_table = connection.ops.quote_name(User._meta.db_table)
+        count_column = connection.ops.quote_name(User._meta.get_field('unread_notification_count').column)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                WITH changed AS ({statement}),
+                delta AS (
+                    SELECT notifier_id, SUM(delta) AS delta FROM changed
+                    GROUP BY notifier_id HAVING SUM(delta) <> 0
+                ),
+                updated AS (
+                    UPDATE {user_table} u SET {count_column} = GREATEST(u.{count_column} + delta.delta, 0)
+                    FROM delta WHERE u.id = delta.notifier_id
+                    RETURNING u.id, u.{count_column} AS unread_count
+                )
+                SELECT (SELECT COUNT(*) FROM changed), (SELECT json_agg(json_build_array(id, unread_count)) FROM updated)
+            """, params)
+            count, unread_count_list = cursor.fetchone()
+
+        if isinstance(unread_count_list, str):
+            unread_count_list = json.loads(unread_count_list)
+        return count, {user_id: unread_count for user_id, unread_count in unread_count_list or []}
+
+    def mark_read(self):
+        """标记已读, 返回 (标记条数, {通知人 ID: 最新未读数量})"""
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        id_sql, params = self.filter(is_read=False).values('id').query.sql_with_params()
+        return self.execute_with_unread_count(
+            f'UPDATE {table} SET is_read = true WHERE id IN ({id_sql}) AND NOT is_read RETURNING notifier_id, -1 AS delta',
+            params)
+
+    def discard(self):
+        """删除通知(不处理附件文件), 返回 (删除条数, {通知人 ID: 最新未读数量})"""
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        id_sql, params = self.values('id').query.sql_with_params()
+        return self.execute_with_unread_count(
+            f'DELETE FROM {table} WHERE id IN ({id_sql}) '
+            f'RETURNING notifier_id, CASE WHEN is_read THEN 0 ELSE -1 END AS delta',
+            params)
+
+    def delete(self):
+        count, _ = self.discard()
+        return count, {self.model._meta.label: count} if count else {}
+
+    @transaction.atomic
+    def bulk_create(self, objs, *args, **kwargs):
+        """批量新建通知并增加未读数量, 通知的 unread_count 为新建后通知人的未读数量"""
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+        unread_count_map = User.adjust_unread_notification_count(
+            Counter(obj.notifier_id for obj in objs if not obj.is_read))
+        for obj in objs:
+            obj.unread_count = unread_count_map.get(obj.notifier_id)
+        return objs
 
 
 class Notification(Model):
-    """通知"""
+    """通知
+
+    未读通知数量记录在 User.unread_notification_count 中, 新建、标记已读和删除通知需要通过
+    save / delete 或 NotificationQuerySet 的方法执行, 直接 update(is_read=...) 不会同步数量.
+    """
 
     class NotificationType(models.TextChoices):
         """通知类型"""
@@ -147,34 +292,95 @@ class Notification(Model):
     has_attachment = models.BooleanField(default=False, verbose_name='附件状态')
     notifier = models.ForeignKey(
         'system.User', on_delete=models.CASCADE, related_name='notification_set', verbose_name='通知人')
-    is_read = models.BooleanField(default=False, db_index=True, verbose_name='已读状态')
+    is_read = models.BooleanField(default=False, verbose_name='已读状态')
+    digest_key = models.CharField(max_length=60, null=True, blank=True, verbose_name='合并标识')
+    digest_count = models.IntegerField(default=1, verbose_name='合并数量')
     create_time = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='创建时间')
 
+    objects = Manager.from_queryset(NotificationQuerySet)()
+
+    class Meta:
+        indexes = [
+            Index(fields=['notifier'], condition=Q(is_read=False), name='notification_unread_idx'),
+            Index(fields=['notifier', 'digest_key'], condition=Q(is_read=False, digest_key__isnull=False),
+                  name='notification_digest_idx'),
+            Index(fields=['notifier', '-create_time', '-id'], name='notification_feed_idx'),
+        ]
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding and not self.is_read:
+            self.unread_count = User.adjust_unread_notification_count({self.notifier_id: 1}).get(self.notifier_id)
+
+    def delete(self, using=None, keep_parents=False):
+        return Notification.objects.filter(pk=self.pk).delete()
+
 
 class NumberRegistry(models.Model):
-    """编号注册表"""
+    """编号注册表, 每个键记录已分配的最大序号"""
 
     class DataModel(models.TextChoices):
         """数据模型"""
 
         EXPORT_TASK = ('export_task', '导出任务')
         IMPORT_TASK = ('import_task', '导入任务')
+        USER = ('user', '员工账号')
+        WAREHOUSE = ('warehouse', '仓库管理')
+        MODEL_FIELD = ('model_field', '模型字段')
+        ACCOUNT = ('account', '结算账户')
 
-    number = models.CharField(max_length=20, unique=True, verbose_name='编号')
+    key = models.CharField(max_length=60, unique=True, verbose_name='键')
     model = models.CharField(max_length=20, choices=DataModel.choices, db_index=True, verbose_name='模型')
-    create_time = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='创建时间')
+    value = models.BigIntegerField(default=0, verbose_name='序号')
+    update_time = models.DateTimeField(auto_now=True, verbose_name='修改时间')
+
+    @classmethod
+    def allocate(cls, model, count=1, period=None):
+        """原子地分配 count 个连续序号
+
+        单条 INSERT ... ON CONFLICT DO UPDATE 完成, 行锁保证并发安全;
+        分配与调用方处于同一事务, 回滚时序号一并回滚, 不会重复也不会跳号.
+        """
+
+        key = f'{model}.{period}' if period else model
+        table = connection.ops.quote_name(cls._meta.db_table)
+        sql = f"""
+            INSERT INTO {table} (key, model, value, update_time) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (key) DO UPDATE SET value = {table}.value + EXCLUDED.value, update_time = EXCLUDED.update_time
+            RETURNING value
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [key, model, count, timezone.now()])
+            end_value = cursor.fetchone()[0]
+        return range(end_value - count + 1, end_value + 1)
 
     @classmethod
     def generate_number(cls, prefix, model):
-        today = timezone.now().strftime('%Y%m%d')
-        today_count = NumberRegistry.objects.filter(model=model, create_time__date=timezone.now().date()).count()
+        """生成按日编号, 如 EX20250101-001"""
+
+        today = timezone.localtime().strftime('%Y%m%d')
+        value = cls.allocate(model, period=today)[0]
 
-        if today_count > 999:
+        if value > 999:
             raise ValidationError('超出当日创建上限')
 
-        number = f'{prefix}{today}-{today_count + 1:03d}'
-        NumberRegistry.objects.create(number=number, model=model)
-        return number
+        return f'{prefix}{today}-{value:03d}'
+
+    @classmethod
+    def generate_serial_number(cls, prefix, model):
+        """生成流水编号, 如 U001"""
+
+        return cls.generate_serial_number_list(prefix, model, 1)[0]
+
+    @classmethod
+    def generate_serial_number_list(cls, prefix, model, count):
+        """批量生成流水编号, 一次分配 count 个序号"""
+
+        if count == 0:
+            return []
+        return [f'{prefix}{value:03d}' for value in cls.allocate(model, count)]
 
 
 __all__ = [
@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q, QuerySet
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from apps.system.consumers import NotificationConsumer
+from apps.system.models import Notification, User
+from apps.system.serializers import NotificationSerializer
+from apps.tenant.models import ErrorLog
+from extensions.progress import channel_publisher
+
+
+class NotificationService:
+    """通知服务
+
+    按接收人批次创建通知: 每批一次 bulk_create(同时更新未读数量), 事务提交后推送; 接收人不超过 unicast_threshold 时
+    逐个发送到用户组, 否则每 multicast_batch_size 个接收人向租户组播组发送一次, 限制每个连接收到的数据量.
+    推送数据为序列化后的通知, 连接只按用户 ID 取出自己的数据转发, 不查询数据库.
+    指定 digest_key 时开启合并模式, 接收人在 digest_window 秒内存在相同标识的未读通知时更新该通知
+    (合并数量加一、内容替换为最新内容、创建时间更新为当前时间), 不新建通知; 合并后的通知排到通知流最前, 增量查询可以取到.
+    """
+
+    batch_size = 500
+    unicast_threshold = 10
+    multicast_batch_size = 100
+    digest_window = 60
+
+    @staticmethod
+    def get_recipient_ids(recipients):
+        """接收人可以是用户查询集、用户或用户 ID 列表"""
+
+        if isinstance(recipients, QuerySet):
+            return list(recipients.values_list('id', flat=True))
+        return list(dict.fromkeys(recipient.id if isinstance(recipient, User) else recipient for recipient in recipients))
+
+    @staticmethod
+    def get_manager_set():
+        return User.live.filter(is_manager=True, is_enabled=True)
+
+    @staticmethod
+    def get_role_user_set(*roles):
+        return User.live.filter(role_set__in=roles, is_enabled=True).distinct()
+
+    @staticmethod
+    def get_permission_user_set(code):
+        """拥有权限的用户, 包含管理员"""
+
+        return User.live.filter(Q(is_manager=True) | Q(permissions__contains=[code]), is_enabled=True)
+
+    def create(self, recipients, title, type, content, digest_key=None, digest_window=None, **fields):
+        """创建通知, 返回通知列表, 通知的 unread_count 为通知人最新未读数量"""
+
+        recipient_ids = self.get_recipient_ids(recipients)
+        notification_list = []
+        for index in range(0, len(recipient_ids), self.batch_size):
+            notification_list.extend(self.create_batch(
+                recipient_ids[index:index + self.batch_size], title, type, content, digest_key, digest_window, fields))
+        return notification_list
+
+    @transaction.atomic
+    def create_batch(self, recipient_ids, title, type, content, digest_key, digest_window, fields):
+        notification_list = []
+        if digest_key is not None:
+            digest_time = timezone.now() - timedelta(seconds=digest_window or self.digest_window)
+            digest_set = Notification.objects.filter(
+                notifier_id__any=recipient_ids, digest_key=digest_key, is_read=False, create_time__gte=digest_time)
+            digest_map = {}
+            for notifier_id, notification_id in digest_set.select_for_update(of=('self',)).order_by('-id').values_list(
+                    'notifier_id', 'id'):
+                digest_map.setdefault(notifier_id, notification_id)
+            if digest_map:
+                Notification.objects.filter(id__any=list(digest_map.values())).update(
+                    title=title, type=type, content=content, digest_count=F('digest_count') + 1, create_time=Now())
+                unread_count_map = dict(User.objects.filter(id__any=list(digest_map.keys()))
+                                        .values_list('id', 'unread_notification_count'))
+                for notification in Notification.objects.filter(id__any=list(digest_map.values())):
+                    notification.unread_count = unread_count_map.get(notification.notifier_id)
+                    notification_list.append(notification)
+                recipient_ids = [recipient_id for recipient_id in recipient_ids if recipient_id not in digest_map]
+
+        if recipient_ids:
+            notification_list.extend(Notification.objects.bulk_create([
+                Notification(title=title, type=type, content=content, notifier_id=recipient_id,
+                             digest_key=digest_key, **fields)
+                for recipient_id in recipient_ids
+            ]))
+        return notification_list
+
+    def publish(self, notification_list):
+        """事务提交后推送通知"""
+
+        for index in range(0, len(notification_list), self.batch_size):
+            batch_list = notification_list[index:index + self.batch_size]
+            data_map = {}
+            for notification, item in zip(batch_list, NotificationSerializer(instance=batch_list, many=True).data):
+                data = data_map.setdefault(str(notification.notifier_id), {'notification_items': []})
+                data['unread_count'] = notification.unread_count
+                data['notification_items'].append(item)
+            self.send(data_map)
+
+    def publish_unread_count(self, unread_count_map):
+        """事务提交后推送最新未读数量, unread_count_map 为 {用户 ID: 未读数量}"""
+
+        user_id_list = list(unread_count_map)
+        for index in range(0, len(user_id_list), self.batch_size):
+            self.send({
+                str(user_id): {'unread_count': unread_count_map[user_id], 'notification_items': []}
+                for user_id in user_id_list[index:index + self.batch_size]
+            })
+
+    def send(self, data_map):
+        """接收人不超过 unicast_threshold 时逐个发送到用户组, 否则按 multicast_batch_size 分组向组播组发送"""
+
+        if len(data_map) <= self.unicast_threshold:
+            self.send_unicast(data_map)
+            return
+
+        user_id_list = list(data_map)
+        for index in range(0, len(user_id_list), self.multicast_batch_size):
+            self.send_multicast({
+                user_id: data_map[user_id] for user_id in user_id_list[index:index + self.multicast_batch_size]
+            })
+
+    @staticmethod
+    async def deliver(coroutine):
+        """发送在后台事件循环中完成, 失败时写入错误日志"""
+
+        try:
+            await coroutine
+        except Exception as error:
+            await ErrorLog.objects.acreate(module='通知推送', content=str(error))
+
+    def send_unicast(self, data_map):
+        if not data_map:
+            return
+
+        transaction.on_commit(lambda: channel_publisher.submit(self.deliver(NotificationConsumer.send_unicast(data_map))))
+
+    def send_multicast(self, data_map):
+        if not data_map:
+            return
+
+        schema_name = connection.schema_name
+        transaction.on_commit(lambda: channel_publisher.submit(
+            self.deliver(NotificationConsumer.send_multicast(schema_name, data_map))))
+
+    def notify(self, recipients, title, type, content, digest_key=None, digest_window=None, **fields):
+        """创建并推送通知, 返回通知列表"""
+
+        notification_list = self.create(recipients, title, type, content, digest_key, digest_window, **fields)
+        self.publish(notification_list)
+        return notification_list
+
+
+notification_service = NotificationService()
+
+
+__all__ = [
+    'NotificationService',
+    'notification_service',
+]
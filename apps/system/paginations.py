@@ -0,0 +1,13 @@
+from extensions.paginations import KeysetPaginationEx
+
+
+class NotificationFeedPagination(KeysetPaginationEx):
+    """通知流游标分页, 与索引 notification_feed_idx(notifier, -create_time, -id) 一致"""
+
+    ordering = ['-create_time', '-id']
+    page_size = 20
+
+
+__all__ = [
+    'NotificationFeedPagination',
+]
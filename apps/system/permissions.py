@@ -5,6 +5,10 @@ class WarehousePermission(ModelPermission):
     code = 'warehouse'
 
 
+class WarehouseExportPermission(FunctionPermission):
+    code = 'warehouse.export'
+
+
 class WarehouseLockPermission(FunctionPermission):
     code = 'warehouse.lock'
 
@@ -15,6 +19,7 @@ class WarehouseUnlockPermission(FunctionPermission):
 
 __all__ = [
     'WarehousePermission',
+    'WarehouseExportPermission',
     'WarehouseLockPermission',
     'WarehouseUnlockPermission',
 ]
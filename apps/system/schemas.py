@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from rest_framework.serializers import Serializer
 
+from apps.system.serializers import NotificationSerializer
+
 
 class CreateTokenRequest(Serializer):
     username = serializers.CharField(label='用户名')
@@ -50,6 +52,13 @@ class FieldConfigResponse(Serializer):
     source = serializers.CharField(label='来源')
 
 
+class NotificationFeedResponse(Serializer):
+    unread_count = serializers.IntegerField(label='未读数量')
+    next = serializers.URLField(allow_null=True, label='下一页')
+    previous = serializers.URLField(allow_null=True, label='上一页')
+    results = NotificationSerializer(many=True, label='通知')
+
+
 __all__ = [
     'CreateTokenRequest',
     'CreateTokenResponse',
@@ -59,4 +68,5 @@ __all__ = [
     'UserProfileResponse',
     'SetPasswordRequest',
     'FieldConfigResponse',
+    'NotificationFeedResponse',
 ]
@@ -54,8 +54,7 @@ class UserSerializer(ModelSerializerEx):
         return super().validate(attrs)
 
     def create(self, validated_data):
-        total_count = User.objects.all().count() + 1
-        validated_data['number'] = f'U{total_count:03d}'
+        validated_data['number'] = NumberRegistry.generate_serial_number('U', NumberRegistry.DataModel.USER)
         validated_data['password'] = make_password(validated_data['username'])
         return super().create(validated_data)
 
@@ -89,8 +88,7 @@ class WarehouseSerializer(ModelSerializerEx):
         return super().validate(attrs)
 
     def create(self, validated_data):
-        total_count = Warehouse.objects.all().count() + 1
-        validated_data['number'] = f'W{total_count:03d}'
+        validated_data['number'] = NumberRegistry.generate_serial_number('W', NumberRegistry.DataModel.WAREHOUSE)
         return super().create(validated_data)
 
 
@@ -137,8 +135,7 @@ class ModelFieldSerializer(ModelSerializerEx):
         return super().validate(attrs)
 
     def create(self, validated_data):
-        total_count = ModelField.objects.all().count() + 1
-        number = f'CF{total_count:03d}'
+        number = NumberRegistry.generate_serial_number('CF', NumberRegistry.DataModel.MODEL_FIELD)
         validated_data['number'] = number
         validated_data['code'] = number
         return super().create(validated_data)
@@ -158,7 +155,7 @@ class NotificationSerializer(ModelSerializerEx):
     class Meta:
         model = Notification
         fields = ['id', 'title', 'type', 'content', 'attachment_name', 'attachment_format', 'has_attachment', 'notifier',
-                  'is_read', 'create_time']
+                  'is_read', 'digest_count', 'create_time']
 
 
 __all__ = [
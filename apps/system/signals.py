@@ -0,0 +1,70 @@
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.system.caches import invalidate_user
+from apps.system.models import ModelField, Role, User, Warehouse
+from extensions.field_configs import invalidate_model_field_schema
+from extensions.signals import archive_deleted, archive_restored
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_user(instance.id)
+
+
+@receiver(archive_deleted, sender=User)
+@receiver(archive_restored, sender=User)
+def invalidate_archived_user_cache(sender, pk_list, **kwargs):
+    invalidate_user(*pk_list)
+
+
+@receiver(post_save, sender=Warehouse)
+def invalidate_warehouse_user_cache(sender, instance, created, update_fields, **kwargs):
+    # 只有新建、删除和恢复仓库会改变授权仓库范围, 管理员的授权仓库为全部仓库
+    if not created and update_fields is not None and 'is_deleted' not in update_fields:
+        return
+
+    user_ids = set(User.objects.filter(is_manager=True).values_list('id', flat=True))
+    if not created:
+        user_ids.update(instance.user_set.values_list('id', flat=True))
+    invalidate_user(*user_ids)
+
+
+@receiver(archive_deleted, sender=Warehouse)
+@receiver(archive_restored, sender=Warehouse)
+def invalidate_archived_warehouse_user_cache(sender, pk_list, **kwargs):
+    invalidate_user(*User.objects.filter(Q(is_manager=True) | Q(warehouse_set__in=pk_list)).values_list('id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Role)
+@receiver(pre_delete, sender=Role)
+def invalidate_role_user_cache(sender, instance, **kwargs):
+    invalidate_user(*instance.user_set.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=User.role_set.through)
+@receiver(m2m_changed, sender=User.warehouse_set.through)
+def invalidate_user_relation_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if not reverse:
+        invalidate_user(instance.id)
+    elif action == 'pre_clear':
+        invalidate_user(*instance.user_set.values_list('id', flat=True))
+    else:
+        invalidate_user(*pk_set)
+
+
+@receiver(post_save, sender=ModelField)
+@receiver(post_delete, sender=ModelField)
+def invalidate_model_field_cache(sender, instance, **kwargs):
+    invalidate_model_field_schema(instance.model)
+
+
+@receiver(archive_deleted, sender=ModelField)
+@receiver(archive_restored, sender=ModelField)
+def invalidate_archived_model_field_cache(sender, pk_list, **kwargs):
+    invalidate_model_field_schema(*ModelField.objects.filter(id__in=pk_list).values_list('model', flat=True).distinct())
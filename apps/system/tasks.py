@@ -0,0 +1,81 @@
+from celery import shared_task
+from django.db import connection, transaction
+from django_tenants.utils import tenant_context
+
+from apps.system.caches import invalidate_user
+from apps.system.models import Role, User
+from apps.tenant.models import ErrorLog, Tenant
+
+SYNC_BATCH_SIZE = 500
+SYNC_BACKGROUND_THRESHOLD = 2000
+
+
+def sync_user_permissions(user_ids):
+    """在数据库中按角色权限的并集重新计算用户权限, 仅写入权限集合发生变化的用户"""
+
+    relation_meta = User.role_set.through._meta
+    user_table = connection.ops.quote_name(User._meta.db_table)
+    role_table = connection.ops.quote_name(Role._meta.db_table)
+    relation_table = connection.ops.quote_name(relation_meta.db_table)
+    user_column = connection.ops.quote_name(relation_meta.get_field('user').column)
+    role_column = connection.ops.quote_name(relation_meta.get_field('role').column)
+
+    sql = f"""
+        WITH computed AS (
+            SELECT u.id, COALESCE((
+                SELECT jsonb_agg(DISTINCT p.code ORDER BY p.code)
+                FROM {relation_table} ur
+                JOIN {role_table} r ON r.id = ur.{role_column}
+                CROSS JOIN LATERAL jsonb_array_elements_text(r.permissions) AS p(code)
+                WHERE ur.{user_column} = u.id
+            ), '[]'::jsonb) AS permissions
+            FROM {user_table} u
+            WHERE u.id = ANY(%s)
+        )
+        UPDATE {user_table} u SET permissions = computed.permissions
+        FROM computed
+        WHERE u.id = computed.id
+          AND NOT (u.permissions @> computed.permissions AND computed.permissions @> u.permissions)
+        RETURNING u.id
+    """
+
+    user_ids = list(user_ids)
+    updated_ids = []
+    with connection.cursor() as cursor:
+        for index in range(0, len(user_ids), SYNC_BATCH_SIZE):
+            cursor.execute(sql, [user_ids[index:index + SYNC_BATCH_SIZE]])
+            updated_ids.extend(row[0] for row in cursor.fetchall())
+
+    invalidate_user(*updated_ids)
+    return updated_ids
+
+
+def propagate_user_permissions(user_ids):
+    """同步用户权限, 用户数量较多时提交后转为后台任务"""
+
+    user_ids = list(user_ids)
+    if len(user_ids) <= SYNC_BACKGROUND_THRESHOLD:
+        return sync_user_permissions(user_ids)
+
+    tenant_id = connection.tenant.id
+    transaction.on_commit(lambda: sync_user_permissions_task.delay(tenant_id, user_ids))
+    return None
+
+
+@shared_task
+def sync_user_permissions_task(tenant_id, user_ids):
+    tenant = Tenant.objects.get(id=tenant_id)
+    with tenant_context(tenant):
+        try:
+            for index in range(0, len(user_ids), SYNC_BATCH_SIZE):
+                with transaction.atomic():
+                    sync_user_permissions(user_ids[index:index + SYNC_BATCH_SIZE])
+        except Exception as error:
+            ErrorLog.objects.create(module='角色权限同步', content=str(error))
+
+
+__all__ = [
+    'sync_user_permissions',
+    'propagate_user_permissions',
+    'sync_user_permissions_task',
+]
@@ -1,3 +1,318 @@
-from django.test import TestCase
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.system.models import Notification, NumberRegistry, Role, User, Warehouse
+from apps.system.notifications import notification_service
+from apps.system.tasks import sync_user_permissions
+from apps.system.views import NotificationViewSet, RoleViewSet, UserViewSet, WarehouseViewSet
+from apps.task.views import ExportTaskViewSet
+from extensions.filters import SearchFilterEx
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class QueryBudgetTestCase(TenantTestCase):
+    """查询预算: raise 模式下查询数超出预算或存在 N+1 查询时抛出 QueryBudgetExceeded"""
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.number = 'test'
+        tenant.expiry_time = timezone.now() + timedelta(days=365)
+
+    def setUp(self):
+        self.user = User.objects.create(number='U000', username='manager', name='管理员', is_manager=True)
+        warehouse_list = [Warehouse.objects.create(number=f'W{index:03}', name=f'仓库{index}') for index in range(5)]
+        role_list = [Role.objects.create(name=f'角色{index}') for index in range(5)]
+
+        # 多条数据且每条关联多个角色、仓库, 序列化关联字段时存在 N+1 查询会被审计发现
+        for index in range(5):
+            user = User.objects.create(number=f'U{index + 1:03}', username=f'user{index}', name=f'用户{index}')
+            user.role_set.set(role_list)
+            user.warehouse_set.set(warehouse_list)
+
+    def get_response(self, viewset_class, action, path='/', **kwargs):
+        request = APIRequestFactory().get(path)
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.user)
+        return viewset_class.as_view({'get': action})(request, **kwargs)
+
+    def test_list(self):
+        for viewset_class in [UserViewSet, RoleViewSet, WarehouseViewSet, NotificationViewSet, ExportTaskViewSet]:
+            with self.subTest(viewset_class=viewset_class.__name__):
+                response = self.get_response(viewset_class, 'list')
+                self.assertEqual(response.status_code, 200)
+
+    def test_list_fields(self):
+        response = self.get_response(UserViewSet, 'list', '/?fields=id,name,role_items')
+        self.assertEqual(response.status_code, 200)
+
+    def test_retrieve(self):
+        user = User.objects.exclude(id=self.user.id).first()
+        response = self.get_response(UserViewSet, 'retrieve', pk=user.id)
+        self.assertEqual(response.status_code, 200)
+
+
+class SearchFilterTestCase(TenantTestCase):
+    """搜索过滤: 短搜索词命中前缀索引, 长搜索词命中三元组索引"""
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.number = 'test'
+        tenant.expiry_time = timezone.now() + timedelta(days=365)
+
+    def setUp(self):
+        User.objects.create(number='U001', username='zhangsan', name='张三')
+        User.objects.create(number='U002', username='lizhang', name='李张')
+
+    def search(self, term):
+        request = Request(APIRequestFactory().get('/', {'search': term}))
+        return SearchFilterEx().filter_queryset(request, User.objects.all(), UserViewSet())
+
+    def explain(self, queryset):
+        # 测试数据很少, 关闭顺序扫描后检查查询能否使用索引
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def test_short_term(self):
+        queryset = self.search('张')
+        self.assertEqual(list(queryset.values_list('name', flat=True)), ['张三'])
+        self.assertIn('user_name_prefix', self.explain(queryset))
+
+    def test_long_term(self):
+        queryset = self.search('zhang')
+        self.assertEqual(sorted(queryset.values_list('name', flat=True)), ['张三', '李张'])
+        self.assertIn('user_name_trgm', self.explain(queryset))
+
+
+class PermissionSyncTestCase(TenantTestCase):
+    """权限同步: 用户权限为所属角色权限的并集, 只写入权限集合发生变化的用户"""
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.number = 'test'
+        tenant.expiry_time = timezone.now() + timedelta(days=365)
+
+    def setUp(self):
+        role1 = Role.objects.create(name='角色1', permissions=['b', 'a'])
+        role2 = Role.objects.create(name='角色2', permissions=['a', 'c'])
+
+        self.user1 = User.objects.create(number='U001', username='user1', name='用户1')
+        self.user1.role_set.set([role1, role2])
+        self.user2 = User.objects.create(number='U002', username='user2', name='用户2', permissions=['x'])
+        self.user3 = User.objects.create(number='U003', username='user3', name='用户3', permissions=['a', 'b'])
+        self.user3.role_set.set([role1])
+
+    def test_sync(self):
+        user_ids = [self.user1.id, self.user2.id, self.user3.id]
+        updated_ids = sync_user_permissions(user_ids)
+        self.assertCountEqual(updated_ids, [self.user1.id, self.user2.id])
+
+        permissions_map = dict(User.objects.filter(id__in=user_ids).values_list('id', 'permissions'))
+        self.assertEqual(permissions_map[self.user1.id], ['a', 'b', 'c'])
+        self.assertEqual(permissions_map[self.user2.id], [])
+        self.assertEqual(permissions_map[self.user3.id], ['a', 'b'])
+
+        # 权限集合未变化时不再写入
+        self.assertEqual(sync_user_permissions(user_ids), [])
+
+
+class NumberRegistryTestCase(TenantTestCase):
+    """编号分配: 同一键的序号连续且不重复, 回滚时序号一并回滚"""
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.number = 'test'
+        tenant.expiry_time = timezone.now() + timedelta(days=365)
+
+    def test_allocate(self):
+        model = NumberRegistry.DataModel.USER
+        self.assertEqual(list(NumberRegistry.allocate(model)), [1])
+        self.assertEqual(list(NumberRegistry.allocate(model, 3)), [2, 3, 4])
+        self.assertEqual(NumberRegistry.generate_serial_number_list('U', model, 2), ['U005', 'U006'])
+
+        # 已存在的键走 ON CONFLICT 分支累加, 每个键只有一行
+        self.assertEqual(list(NumberRegistry.objects.filter(key=model).values_list('value', flat=True)), [6])
+
+    def test_period(self):
+        model = NumberRegistry.DataModel.EXPORT_TASK
+        self.assertEqual(list(NumberRegistry.allocate(model, period='20250101')), [1])
+        self.assertEqual(list(NumberRegistry.allocate(model, period='20250102')), [1])
+        self.assertEqual(list(NumberRegistry.allocate(model, period='20250101')), [2])
+
+        value_map = dict(NumberRegistry.objects.filter(model=model).values_list('key', 'value'))
+        self.assertEqual(value_map, {f'{model}.20250101': 2, f'{model}.20250102': 1})
+
+    def test_rollback(self):
+        model = NumberRegistry.DataModel.WAREHOUSE
+        NumberRegistry.allocate(model)
+        try:
+            with transaction.atomic():
+                self.assertEqual(list(NumberRegistry.allocate(model, 2)), [2, 3])
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        # 回滚的序号重新分配, 不跳号
+        self.assertEqual(list(NumberRegistry.allocate(model)), [2])
+
+
+class UndoDeleteTestCase(TenantTestCase):
+    """批量恢复: 与未删除数据或批次内数据存在唯一约束冲突时不恢复任何数据"""
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.number = 'test'
+        tenant.expiry_time = timezone.now() + timedelta(days=365)
+
+    def create_deleted(self, number, name):
+        warehouse = Warehouse.objects.create(number=number, name=name)
+        warehouse.delete()
+        return warehouse
+
+    def test_undo_delete(self):
+        warehouse_ids = [self.create_deleted('R001', '恢复仓库1').id, self.create_deleted('R002', '恢复仓库2').id]
+        count, conflict_list = Warehouse.objects.filter(id__in=warehouse_ids).undo_delete()
+        self.assertEqual((count, conflict_list), (2, []))
+        self.assertEqual(Warehouse.live.filter(id__in=warehouse_ids).count(), 2)
+
+    def test_live_conflict(self):
+        warehouse_ids = [self.create_deleted('R001', '恢复仓库1').id, self.create_deleted('R002', '恢复仓库2').id]
+        Warehouse.objects.create(number='R003', name='恢复仓库1')
+
+        count, conflict_list = Warehouse.objects.filter(id__in=warehouse_ids).undo_delete()
+        self.assertEqual(count, 0)
+        self.assertEqual([(field_group, row['pk']) for field_group, row in conflict_list],
+                         [(('name',), warehouse_ids[0])])
+        self.assertEqual(Warehouse.live.filter(id__in=warehouse_ids).count(), 0)
+
+    def test_batch_conflict(self):
+        warehouse_ids = [self.create_deleted('R001', '恢复仓库1').id, self.create_deleted('R002', '恢复仓库1').id]
+
+        count, conflict_list = Warehouse.objects.filter(id__in=warehouse_ids).undo_delete()
+        self.assertEqual(count, 0)
+        self.assertEqual(len(conflict_list), 1)
+        self.assertEqual(Warehouse.live.filter(id__in=warehouse_ids).count(), 0)
+
+
+class NotificationDigestTestCase(TenantTestCase):
+    """通知合并: 合并窗口内存在相同标识的未读通知时更新该通知, 未读数量只在新建通知时增加"""
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.number = 'test'
+        tenant.expiry_time = timezone.now() + timedelta(days=365)
+
+    def setUp(self):
+        self.user1 = User.objects.create(number='N001', username='notify1', name='用户1')
+        self.user2 = User.objects.create(number='N002', username='notify2', name='用户2')
+
+    def create(self, recipients, content):
+        return notification_service.create(
+            recipients, '导出完成', Notification.NotificationType.INFO, content, digest_key='export')
+
+    def get_unread_count(self, user):
+        return User.objects.values_list('unread_notification_count', flat=True).get(id=user.id)
+
+    def test_digest(self):
+        notification = self.create([self.user1], '内容1')[0]
+        notification_list = self.create([self.user1, self.user2], '内容2')
+
+        unread_count_map = {item.notifier_id: item.unread_count for item in notification_list}
+        self.assertEqual(unread_count_map, {self.user1.id: 1, self.user2.id: 1})
+        self.assertEqual(self.get_unread_count(self.user1), 1)
+        self.assertEqual(self.get_unread_count(self.user2), 1)
+
+        notification.refresh_from_db()
+        self.assertEqual((notification.content, notification.digest_count), ('内容2', 2))
+        self.assertEqual(Notification.objects.filter(notifier=self.user1).count(), 1)
+
+    def test_read(self):
+        # 已读通知不合并
+        self.create([self.user1], '内容1')
+        Notification.objects.filter(notifier=self.user1).mark_read()
+        self.create([self.user1], '内容2')
+
+        self.assertEqual(Notification.objects.filter(notifier=self.user1).count(), 2)
+        self.assertEqual(self.get_unread_count(self.user1), 1)
+
+    def test_window(self):
+        # 超出合并窗口的通知不合并
+        self.create([self.user1], '内容1')
+        Notification.objects.filter(notifier=self.user1).update(create_time=timezone.now() - timedelta(hours=1))
+        self.create([self.user1], '内容2')
+
+        self.assertEqual(list(Notification.objects.filter(notifier=self.user1).values_list('digest_count', flat=True)),
+                         [1, 1])
+        self.assertEqual(self.get_unread_count(self.user1), 2)
+
+
+class NotificationFeedTestCase(TenantTestCase):
+    """通知流: 游标翻页不重复不遗漏, 增量查询按 (创建时间, ID) 返回新通知和合并更新的通知"""
+
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.number = 'test'
+        tenant.expiry_time = timezone.now() + timedelta(days=365)
+
+    def setUp(self):
+        self.user = User.objects.create(number='F001', username='feed', name='通知流用户')
+        base_time = timezone.now() - timedelta(hours=1)
+
+        # 第 2、3 条创建时间相同, 检查边界行同时间不同 ID 的情况
+        self.notification_list = []
+        for index, minutes in enumerate([0, 1, 1, 2, 3]):
+            notification = Notification.objects.create(
+                title=f'通知{index}', type=Notification.NotificationType.INFO, content='内容', notifier=self.user)
+            Notification.objects.filter(id=notification.id).update(create_time=base_time + timedelta(minutes=minutes))
+            notification.refresh_from_db()
+            self.notification_list.append(notification)
+
+    def get_response(self, **params):
+        request = APIRequestFactory().get('/', params)
+        request.tenant = self.tenant
+        force_authenticate(request, user=self.user)
+        # 路由注册时传入 action 的参数(pagination_class)
+        return NotificationViewSet.as_view({'get': 'feed'}, **NotificationViewSet.feed.kwargs)(request)
+
+    def test_pagination(self):
+        id_list = []
+        params = {'page_size': 2}
+        while True:
+            response = self.get_response(**params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['unread_count'], 5)
+            id_list.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                break
+            params['cursor'] = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+
+        self.assertEqual(id_list, [notification.id for notification in reversed(self.notification_list)])
+
+    def test_since_time(self):
+        latest = self.notification_list[1]
+        response = self.get_response(since_time=latest.create_time.isoformat(), since_id=latest.id)
+        self.assertEqual([item['id'] for item in response.data['results']],
+                         [notification.id for notification in reversed(self.notification_list[2:])])
+
+        # 合并更新的通知保留原 ID, 创建时间更新后在增量查询中返回
+        latest = self.notification_list[-1]
+        merged = self.notification_list[0]
+        Notification.objects.filter(id=merged.id).update(create_time=timezone.now())
+        response = self.get_response(since_time=latest.create_time.isoformat(), since_id=latest.id)
+        self.assertEqual([item['id'] for item in response.data['results']], [merged.id])
+
+    def test_since_id(self):
+        since_id = self.notification_list[2].id
+        response = self.get_response(since_id=since_id)
+        self.assertEqual([item['id'] for item in response.data['results']],
+                         [notification.id for notification in reversed(self.notification_list[3:])])
+
+        self.assertEqual(self.get_response(since_time='invalid').status_code, 400)
@@ -1,31 +1,38 @@
-from pathlib import Path
-
 from django.contrib.auth.hashers import check_password, make_password
 from django.db import transaction
-from django.http import FileResponse
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from apps.product.models import *
+from apps.product.tasks import propagate_inventory
 from apps.system.filters import *
 from apps.system.models import *
+from apps.system.notifications import notification_service
+from apps.system.paginations import *
 from apps.system.permissions import *
 from apps.system.schemas import *
 from apps.system.serializers import *
+from apps.system.tasks import propagate_user_permissions
+from apps.task.models import ExportTask
 from extensions.exceptions import (
     AuthenticationFailed,
     NotAuthenticated,
     ValidationError,
 )
+from extensions.files import serve_file
 from extensions.permissions import IsAuthenticated, IsManagerPermission
+from extensions.transfers import BooleanColumn, Column
 from extensions.viewsets import (
     ArchiveViewSet,
     DestroyModelMixin,
+    ExportModelMixin,
     FunctionViewSet,
     ModelViewSetEx,
     QueryViewSet,
@@ -41,36 +48,51 @@ class RoleViewSet(ModelViewSetEx):
 
     @transaction.atomic
     def perform_update(self, serializer):
+        permissions = set(serializer.instance.permissions)
         instance = serializer.save()
 
-        # 更新用户权限
-        user_set = instance.user_set.prefetch_related('role_set').all()
-        for user in user_set:
-            permissions = {permission for role in user.role_set.all() for permission in role.permissions}
-            user.permissions = list(permissions)
-        User.objects.bulk_update(user_set, ['permissions'])
+        # 权限变化时更新用户权限
+        if set(instance.permissions) != permissions:
+            propagate_user_permissions(instance.user_set.values_list('id', flat=True))
 
     @transaction.atomic
     def perform_destroy(self, instance):
-        user_set = instance.user_set.prefetch_related('role_set').all()
+        user_ids = list(instance.user_set.values_list('id', flat=True))
         super().perform_destroy(instance)
 
         # 更新用户权限
-        for user in user_set:
-            permissions = {permission for role in user.role_set.all() for permission in role.permissions}
-            user.permissions = list(permissions)
-        User.objects.bulk_update(user_set, ['permissions'])
+        propagate_user_permissions(user_ids)
+
+    @transaction.atomic
+    def perform_batch_destroy(self, instance_set):
+        user_ids = list(User.objects.filter(role_set__in=instance_set).values_list('id', flat=True).distinct())
+        super().perform_batch_destroy(instance_set)
+
+        # 更新用户权限
+        propagate_user_permissions(user_ids)
 
 
-class UserViewSet(ArchiveViewSet):
+class UserViewSet(ArchiveViewSet, ExportModelMixin):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, IsManagerPermission]
     filterset_class = UserFilter
     search_fields = ['number', 'username', 'name', 'remark']
     ordering_fields = ['id', 'number', 'username', 'name' 'update_time', 'delete_time']
-    prefetch_related_fields = ['warehouse_set', 'role_set']
+    auto_related_fields = True
+    query_budget = {'list': 5, 'retrieve': 4}
     queryset = User.objects.all()
 
+    data_model = ExportTask.DataModel.USER
+    export_columns = [
+        Column('number', '编号'),
+        Column('username', '用户名'),
+        Column('name', '名称'),
+        Column('phone', '手机号'),
+        Column('remark', '备注'),
+        BooleanColumn('is_enabled', '启用状态', '启用', '禁用'),
+    ]
+    export_permission_classes = [IsAuthenticated, IsManagerPermission]
+
     def perform_destroy(self, instance):
         if instance.is_manager:
             raise ValidationError('管理员账号无法删除')
@@ -79,6 +101,7 @@ class UserViewSet(ArchiveViewSet):
     def perform_batch_destroy(self, instance_set):
         if instance_set.filter(is_manager=True).exists():
             raise ValidationError('管理员账号无法删除')
+
         return super().perform_batch_destroy(instance_set)
 
     @extend_schema(responses={204: None})
@@ -106,7 +129,7 @@ class UserActionViewSet(FunctionViewSet):
         serializer.is_valid(raise_exception=True)
         validated_data = serializer.validated_data
 
-        if not (user := User.objects.filter(username=validated_data['username'], is_deleted=False).first()):
+        if not (user := User.live.filter(username=validated_data['username']).first()):
             raise ValidationError('用户不存在')
 
         if not check_password(validated_data['password'], user.password):
@@ -183,7 +206,7 @@ class UserActionViewSet(FunctionViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class WarehouseViewSet(ArchiveViewSet):
+class WarehouseViewSet(ArchiveViewSet, ExportModelMixin):
     serializer_class = WarehouseSerializer
     permission_classes = [IsAuthenticated, WarehousePermission]
     filterset_fields = ['is_locked', 'is_enabled', 'is_deleted']
@@ -191,12 +214,23 @@ class WarehouseViewSet(ArchiveViewSet):
     ordering_fields = ['id', 'number', 'name', 'update_time', 'delete_time']
     queryset = Warehouse.objects.all()
 
+    data_model = ExportTask.DataModel.WAREHOUSE
+    export_columns = [
+        Column('number', '编号'),
+        Column('name', '名称'),
+        Column('address', '地址'),
+        Column('remark', '备注'),
+        BooleanColumn('is_locked', '锁定状态', '锁定', '未锁定'),
+        BooleanColumn('is_enabled', '启用状态', '启用', '禁用'),
+    ]
+    export_permission_classes = [IsAuthenticated, WarehouseExportPermission]
+
     @transaction.atomic
     def perform_create(self, serializer):
         instance = serializer.save()
 
         # 同步库存
-        Inventory.objects.bulk_create([Inventory(warehouse=instance, product=product) for product in Product.objects.all()])
+        propagate_inventory(self.user, warehouse_ids=[instance.id])
 
     @transaction.atomic
     def perform_destroy(self, instance):
@@ -256,7 +290,7 @@ class SystemConfigViewSet(FunctionViewSet):
     def field_config(self, request, *args, **kwargs):
         """字段配置"""
 
-        serializer = FieldConfigResponse(instance=ModelField.objects.filter(is_deleted=False), many=True)
+        serializer = FieldConfigResponse(instance=ModelField.live.all(), many=True)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
 
@@ -271,9 +305,55 @@ class NotificationViewSet(QueryViewSet, DestroyModelMixin):
     def get_queryset(self):
         return super().get_queryset().filter(notifier=self.user)
 
+    @extend_schema(parameters=[
+        OpenApiParameter('since_time', OpenApiTypes.DATETIME, description='增量查询: 已有最新通知的创建时间'),
+        OpenApiParameter('since_id', int, description='增量查询: 已有最新通知的 ID'),
+    ], responses={200: NotificationFeedResponse})
+    @action(detail=False, methods=['get'], pagination_class=NotificationFeedPagination)
+    def feed(self, request, *args, **kwargs):
+        """通知流(游标分页)
+
+        增量查询按 (创建时间, ID) 返回排在已有最新通知之后的通知; 合并通知更新时创建时间随之更新, 会以原 ID 再次返回,
+        客户端按 ID 替换. 只传 since_id 时按 ID 过滤, 取不到合并通知的更新.
+        """
+
+        queryset = self.filter_queryset(self.get_queryset())
+        since_time = request.query_params.get('since_time')
+        since_id = request.query_params.get('since_id')
+        if since_time:
+            if (since_time := parse_datetime(since_time)) is None:
+                raise ValidationError('since_time 无效')
+            if timezone.is_naive(since_time):
+                since_time = timezone.make_aware(since_time)
+
+            condition = Q(create_time__gt=since_time)
+            if since_id:
+                try:
+                    condition |= Q(create_time=since_time, id__gt=int(since_id))
+                except ValueError:
+                    raise ValidationError('since_id 无效')
+            queryset = queryset.filter(condition)
+        elif since_id:
+            try:
+                queryset = queryset.filter(id__gt=int(since_id))
+            except ValueError:
+                raise ValidationError('since_id 无效')
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+
+        # 未读数量读取计数列, 用户快照中的值可能已过期
+        response.data['unread_count'] = User.objects.filter(id=self.user.id).values_list(
+            'unread_notification_count', flat=True).first() or 0
+        return response
+
     def perform_destroy(self, instance):
-        instance.attachment.delete()
-        return super().perform_destroy(instance)
+        # 压缩文件与导出任务共享, 由 sweep_artifacts_task 清理
+        if instance.attachment and not instance.attachment.name.endswith('.gz'):
+            instance.attachment.delete()
+        _, unread_count_map = Notification.objects.filter(pk=instance.pk).discard()
+        notification_service.publish_unread_count(unread_count_map)
 
     @extend_schema(responses={200: NotificationSerializer})
     @action(detail=True, methods=['post'])
@@ -281,8 +361,9 @@ class NotificationViewSet(QueryViewSet, DestroyModelMixin):
         """标记已读"""
 
         instance = self.get_object()
+        _, unread_count_map = Notification.objects.filter(pk=instance.pk).mark_read()
+        notification_service.publish_unread_count(unread_count_map)
         instance.is_read = True
-        instance.save(update_fields=['is_read'])
 
         serializer = NotificationSerializer(instance=instance)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
@@ -292,7 +373,8 @@ class NotificationViewSet(QueryViewSet, DestroyModelMixin):
     def read_all(self, request, *args, **kwargs):
         """全部已读"""
 
-        Notification.objects.filter(notifier=self.user).update(is_read=True)
+        _, unread_count_map = Notification.objects.filter(notifier=self.user).mark_read()
+        notification_service.publish_unread_count(unread_count_map)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @extend_schema(responses={204: None})
@@ -300,7 +382,8 @@ class NotificationViewSet(QueryViewSet, DestroyModelMixin):
     def delete_unread(self, request, *args, **kwargs):
         """删除未读"""
 
-        Notification.objects.filter(notifier=self.user, is_read=False).delete()
+        _, unread_count_map = Notification.objects.filter(notifier=self.user, is_read=False).discard()
+        notification_service.publish_unread_count(unread_count_map)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @extend_schema(responses={204: None})
@@ -308,11 +391,11 @@ class NotificationViewSet(QueryViewSet, DestroyModelMixin):
     def delete_read(self, request, *args, **kwargs):
         """删除已读"""
 
-        Notification.objects.filter(notifier=self.user, is_read=True).delete()
+        Notification.objects.filter(notifier=self.user, is_read=True).discard()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @extend_schema(responses={200: OpenApiTypes.BINARY})
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['get', 'post'])
     def download(self, request, *args, **kwargs):
         """下载附件"""
 
@@ -320,11 +403,7 @@ class NotificationViewSet(QueryViewSet, DestroyModelMixin):
         if not notification.has_attachment:
             raise ValidationError(f'不存在附件, 无法下载')
 
-        file_path = notification.attachment.path
-        if not Path(file_path).exists():
-            raise ValidationError(f'附件不存在')
-
-        return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=notification.attachment_name)
+        return serve_file(request, notification.attachment, notification.attachment_name, missing_message='附件不存在')
 
 
 __all__ = [
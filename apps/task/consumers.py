@@ -1,4 +1,4 @@
-from apps.task.models import ExportTask
+from apps.task.models import ExportTask, ImportTask
 from extensions.consumers import AsyncJsonWebsocketConsumerEx
 from extensions.exceptions import ValidationError
 
@@ -27,6 +27,32 @@ class ExportTaskConsumer(AsyncJsonWebsocketConsumerEx):
         await self.send_json({'status_code': 200, 'data': data}, is_close)
 
 
+class ImportTaskConsumer(AsyncJsonWebsocketConsumerEx):
+    consumer_code = 'import_task'
+
+    async def init_data(self):
+        if not (import_task_number := self.scope['query_params'].get('number')):
+            raise ValidationError('缺失任务编号')
+
+        if not (import_task := await ImportTask.objects.filter(number=import_task_number, creator=self.user).afirst()):
+            raise ValidationError('没有进行中的任务')
+
+        if import_task.status != ImportTask.ImportStatus.IMPORTING:
+            completed_count = import_task.import_count if import_task.status == ImportTask.ImportStatus.COMPLETED else 0
+            await self.handle_event({'data': {
+                'import_status': import_task.status,
+                'total_count': import_task.import_count,
+                'completed_count': completed_count,
+                'error_message_list': import_task.error_message_list,
+            }})
+
+    async def handle_event(self, event):
+        data = event['data']
+        is_close = data['import_status'] != ImportTask.ImportStatus.IMPORTING
+        await self.send_json({'status_code': 200, 'data': data}, is_close)
+
+
 __all__ = [
     'ExportTaskConsumer',
+    'ImportTaskConsumer',
 ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.8 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exporttask',
+            name='model',
+            field=models.CharField(choices=[('account', '结算账户'), ('user', '用户'), ('warehouse', '仓库')], db_index=True, max_length=20, verbose_name='模型'),
+        ),
+    ]
@@ -9,6 +9,8 @@ class ExportTask(Model):
         """数据模型"""
 
         ACCOUNT = ('account', '结算账户')
+        USER = ('user', '用户')
+        WAREHOUSE = ('warehouse', '仓库')
 
     class ExportStatus(models.TextChoices):
         """导出状态"""
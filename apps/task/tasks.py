@@ -0,0 +1,206 @@
+import json
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name, tenant_context
+
+from apps.system.models import Notification
+from apps.system.notifications import notification_service
+from apps.task.consumers import ExportTaskConsumer, ImportTaskConsumer
+from apps.task.models import ExportTask, ImportTask
+from apps.tenant.models import ErrorLog, Tenant
+from extensions.artifacts import artifact_store
+from extensions.progress import ProgressReporter
+from extensions.transfers import data_transfer_registry
+
+
+@shared_task
+def export_data_task(tenant_id, export_task_id):
+    tenant = Tenant.objects.get(id=tenant_id)
+    with tenant_context(tenant):
+        export_task = ExportTask.objects.select_related('creator').get(id=export_task_id)
+        model_name = export_task.get_model_display()
+        total_count = len(export_task.export_id_list)
+        completed_count = 0
+        progress_reporter = ProgressReporter(ExportTaskConsumer, export_task.creator)
+
+        def get_progress():
+            return {
+                'export_status': export_task.status,
+                'total_count': total_count,
+                'completed_count': completed_count,
+            }
+
+        def report_progress(count):
+            nonlocal completed_count
+            completed_count = count
+            progress_reporter.update(get_progress())
+
+        try:
+            viewset_class = data_transfer_registry.get_viewset(export_task.model)
+            export_engine = viewset_class.get_export_engine(export_task.export_id_list, progress_callback=report_progress)
+            export_file, completed_count = export_engine.run()
+
+            # 导出任务和通知共享同一个压缩文件, 保存文件到提交引用期间持有共享锁, 避免被 sweep_artifacts 删除
+            directory = f'{tenant.number}/artifact'
+            with export_file, artifact_store.lock(directory, shared=True):
+                file_path = artifact_store.save(directory, export_file, '.json')
+
+                export_task.export_file.name = file_path
+                export_task.export_count = completed_count
+                export_task.status = ExportTask.ExportStatus.COMPLETED
+                export_task.duration = (timezone.localtime() - export_task.create_time).total_seconds()
+                export_task.save(update_fields=['export_file', 'export_count', 'status', 'duration'])
+
+                notification_list = notification_service.create([export_task.creator], title=f'导出{model_name}',
+                                                                type=Notification.NotificationType.SUCCESS,
+                                                                content=f'{model_name}导出成功, 共导出 {completed_count} 条数据.',
+                                                                attachment=file_path,
+                                                                attachment_name=f'{model_name}列表',
+                                                                attachment_format=Notification.AttachmentFormat.EXCEL,
+                                                                has_attachment=True)
+
+            progress_reporter.send(get_progress())
+        except Exception as error:
+            export_task.status = ExportTask.ExportStatus.FAILED
+            export_task.duration = (timezone.localtime() - export_task.create_time).total_seconds()
+            export_task.error_message = str(error)
+            export_task.save(update_fields=['status', 'duration', 'error_message'])
+
+            notification_list = notification_service.create([export_task.creator], title=f'导出{model_name}',
+                                                            type=Notification.NotificationType.ERROR,
+                                                            content=f'{model_name}导出失败.')
+            progress_reporter.send(get_progress())
+            ErrorLog.objects.create(module=f'{model_name}导出', content=str(error))
+
+        # 推送在后台完成, 推送失败由 notification_service 写入错误日志
+        notification_service.publish(notification_list)
+
+
+@shared_task
+def import_data_task(tenant_id, import_task_id):
+    tenant = Tenant.objects.get(id=tenant_id)
+    with tenant_context(tenant):
+        import_task = ImportTask.objects.select_related('creator').get(id=import_task_id)
+        model_name = import_task.get_model_display()
+        total_count = 0
+        completed_count = 0
+        progress_reporter = ProgressReporter(ImportTaskConsumer, import_task.creator)
+
+        def get_progress(error_message_list=None):
+            return {
+                'import_status': import_task.status,
+                'total_count': total_count,
+                'completed_count': completed_count,
+                'error_message_list': error_message_list or [],
+            }
+
+        def report_progress(count):
+            nonlocal completed_count
+            completed_count = count
+            progress_reporter.update(get_progress())
+
+        try:
+            try:
+                with import_task.import_file.open('rb') as file:
+                    row_list = json.load(file)['data']
+
+                if not isinstance(row_list, list):
+                    raise TypeError
+            except (UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError):
+                error_message_list = ['导入文件格式错误']
+            else:
+                total_count = len(row_list)
+                viewset_class = data_transfer_registry.get_viewset(import_task.model)
+                import_engine = viewset_class.get_import_engine(progress_callback=report_progress)
+                completed_count, error_message_list = import_engine.run(row_list)
+
+            import_task.duration = (timezone.localtime() - import_task.create_time).total_seconds()
+            if error_message_list:
+                completed_count = 0
+                import_task.status = ImportTask.ImportStatus.FAILED
+                import_task.error_message_list = error_message_list
+                import_task.save(update_fields=['status', 'duration', 'error_message_list'])
+
+                notification_list = notification_service.create([import_task.creator], title=f'导入{model_name}',
+                                                                type=Notification.NotificationType.ERROR,
+                                                                content=f'{model_name}导入失败, 共 {len(error_message_list)} 条错误.')
+            else:
+                import_task.status = ImportTask.ImportStatus.COMPLETED
+                import_task.import_count = completed_count
+                import_task.save(update_fields=['status', 'duration', 'import_count'])
+
+                notification_list = notification_service.create([import_task.creator], title=f'导入{model_name}',
+                                                                type=Notification.NotificationType.SUCCESS,
+                                                                content=f'{model_name}导入成功, 共导入 {completed_count} 条数据.')
+            progress_reporter.send(get_progress(error_message_list))
+        except Exception as error:
+            import_task.status = ImportTask.ImportStatus.FAILED
+            import_task.duration = (timezone.localtime() - import_task.create_time).total_seconds()
+            import_task.error_message_list = [str(error)]
+            import_task.save(update_fields=['status', 'duration', 'error_message_list'])
+
+            notification_list = notification_service.create([import_task.creator], title=f'导入{model_name}',
+                                                            type=Notification.NotificationType.ERROR,
+                                                            content=f'{model_name}导入失败.')
+            completed_count = 0
+            progress_reporter.send(get_progress(import_task.error_message_list))
+            ErrorLog.objects.create(module=f'{model_name}导入', content=str(error))
+
+        # 推送在后台完成, 推送失败由 notification_service 写入错误日志
+        notification_service.publish(notification_list)
+
+
+def sweep_artifacts(tenant):
+    """清理租户的导出文件, 返回 (过期引用数量, 删除文件数量)
+
+    创建时间超过 ARTIFACT_RETENTION_DAYS 的导出任务和通知清除文件引用, 不再被引用的压缩文件由 artifact_store 删除;
+    压缩存储之前的导出文件不共享, 在清除引用时直接删除.
+    """
+
+    directory = f'{tenant.number}/artifact'
+    expired_time = timezone.now() - timedelta(days=settings.ARTIFACT_RETENTION_DAYS)
+    expired_export_task_set = ExportTask.objects.filter(create_time__lt=expired_time).exclude(
+        Q(export_file__isnull=True) | Q(export_file=''))
+    expired_notification_set = Notification.objects.filter(create_time__lt=expired_time, has_attachment=True)
+
+    legacy_name_set = {
+        *expired_export_task_set.exclude(export_file__startswith=f'{directory}/').values_list('export_file', flat=True),
+        *expired_notification_set.exclude(attachment__startswith=f'{directory}/').values_list('attachment', flat=True),
+    }
+    expired_count = expired_export_task_set.update(export_file=None)
+    expired_count += expired_notification_set.update(attachment=None, has_attachment=False)
+    for name in legacy_name_set:
+        if name:
+            default_storage.delete(name)
+
+    # 排他锁内查询引用并删除, 导出任务保存文件到提交引用期间持有共享锁
+    with artifact_store.lock(directory):
+        referenced_name_set = {
+            *ExportTask.objects.filter(export_file__startswith=f'{directory}/').values_list('export_file', flat=True),
+            *Notification.objects.filter(attachment__startswith=f'{directory}/').values_list('attachment', flat=True),
+        }
+        delete_count = artifact_store.sweep(directory, referenced_name_set)
+    return expired_count, delete_count
+
+
+@shared_task
+def sweep_artifacts_task():
+    for tenant in Tenant.objects.exclude(schema_name=get_public_schema_name()):
+        with tenant_context(tenant):
+            try:
+                sweep_artifacts(tenant)
+            except Exception as error:
+                ErrorLog.objects.create(module='导出文件清理', content=str(error))
+
+
+__all__ = [
+    'export_data_task',
+    'import_data_task',
+    'sweep_artifacts',
+    'sweep_artifacts_task',
+]
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, connections
+from django.test import TestCase
+from django.utils import timezone
+
+from extensions.artifacts import ArtifactStore
+
+
+class ArtifactStoreTestCase(TestCase):
+    """压缩文件存储: 相同内容只保存一次, 清理时跳过被引用和宽限期内保存或复用的文件"""
+
+    directory = 'test/artifact'
+
+    def setUp(self):
+        temp_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_directory.cleanup)
+        self.storage = FileSystemStorage(location=temp_directory.name)
+        self.artifact_store = ArtifactStore(self.storage)
+
+    def save(self, content):
+        return self.artifact_store.save(self.directory, ContentFile(content), '.xlsx')
+
+    def expire(self, name):
+        expired_time = (timezone.now() - timedelta(hours=2)).timestamp()
+        os.utime(self.storage.path(name), (expired_time, expired_time))
+
+    def test_save(self):
+        name = self.save(b'content')
+        self.assertEqual(self.save(b'content'), name)
+        self.assertNotEqual(self.save(b'other content'), name)
+        self.assertEqual(len(list(self.artifact_store.iter_names(self.directory))), 2)
+
+    def test_sweep(self):
+        referenced_name = self.save(b'referenced')
+        expired_name = self.save(b'expired')
+        recent_name = self.save(b'recent')
+        reused_name = self.save(b'reused')
+        for name in [referenced_name, expired_name, reused_name]:
+            self.expire(name)
+
+        # 复用已有文件时刷新修改时间, 引用提交前不会被清理
+        self.assertEqual(self.save(b'reused'), reused_name)
+
+        delete_count = self.artifact_store.sweep(self.directory, [referenced_name], timedelta(hours=1))
+        self.assertEqual(delete_count, 1)
+        self.assertCountEqual(self.artifact_store.iter_names(self.directory), [referenced_name, recent_name, reused_name])
+
+    def test_lock(self):
+        def try_lock():
+            try:
+                with connections['default'].cursor() as cursor:
+                    cursor.execute('SELECT pg_try_advisory_lock(hashtext(%s))', [self.directory])
+                    result_list.append(cursor.fetchone()[0])
+            finally:
+                connections['default'].close()
+
+        # 保存文件期间持有共享锁, 其他连接无法获取清理用的排他锁
+        result_list = []
+        with self.artifact_store.lock(self.directory, shared=True):
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+        self.assertEqual(result_list, [False])
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(hashtext(%s))', [self.directory])
+            self.assertTrue(cursor.fetchone()[0])
+            cursor.execute('SELECT pg_advisory_unlock(hashtext(%s))', [self.directory])
@@ -1,7 +1,4 @@
-from pathlib import Path
-
 from celery.result import AsyncResult
-from django.http import FileResponse
 from django.utils import timezone
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
@@ -15,6 +12,7 @@ from apps.task.permissions import *
 from apps.task.schemas import *
 from apps.task.serializers import *
 from extensions.exceptions import ValidationError
+from extensions.files import serve_file
 from extensions.permissions import IsAuthenticated
 from extensions.viewsets import ModelViewSetEx
 
@@ -25,7 +23,8 @@ class ExportTaskViewSet(ModelViewSetEx):
     filterset_class = ExportTaskFilter
     search_fields = ['number']
     ordering_fields = ['id', 'create_time']
-    select_related_fields = ['creator']
+    auto_related_fields = True
+    query_budget = {'list': 3, 'retrieve': 2}
     queryset = ExportTask.objects.all()
 
     def get_queryset(self):
@@ -34,7 +33,9 @@ class ExportTaskViewSet(ModelViewSetEx):
         return super().get_queryset().filter(creator=self.user)
 
     def perform_destroy(self, instance):
-        instance.export_file.delete()
+        # 压缩文件与通知共享, 由 sweep_artifacts_task 清理; 压缩存储之前的导出文件不共享, 直接删除
+        if instance.export_file and not instance.export_file.name.endswith('.gz'):
+            instance.export_file.delete(save=False)
         return super().perform_destroy(instance)
 
     @extend_schema(responses={200: ExportTaskSerializer})
@@ -57,7 +58,7 @@ class ExportTaskViewSet(ModelViewSetEx):
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(responses={200: OpenApiTypes.BINARY})
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, ExportTaskDownloadPermission])
+    @action(detail=True, methods=['get', 'post'], permission_classes=[IsAuthenticated, ExportTaskDownloadPermission])
     def download(self, request, *args, **kwargs):
         """下载"""
 
@@ -65,11 +66,7 @@ class ExportTaskViewSet(ModelViewSetEx):
         if export_task.status != ExportTask.ExportStatus.COMPLETED:
             raise ValidationError(f'导出任务未成功或正在进行中, 无法下载')
 
-        file_path = export_task.export_file.path
-        if not Path(file_path).exists():
-            raise ValidationError(f'文件不存在')
-
-        return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=export_task.number)
+        return serve_file(request, export_task.export_file, export_task.number)
 
 
 class ImportTaskViewSet(ModelViewSetEx):
@@ -78,7 +75,8 @@ class ImportTaskViewSet(ModelViewSetEx):
     filterset_class = ImportTaskFilter
     search_fields = ['number']
     ordering_fields = ['id', 'create_time']
-    select_related_fields = ['creator']
+    auto_related_fields = True
+    query_budget = {'list': 3, 'retrieve': 2}
     queryset = ImportTask.objects.all()
 
     def get_queryset(self):
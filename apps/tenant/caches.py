@@ -0,0 +1,39 @@
+import copy
+
+from django.db import transaction
+
+from apps.tenant.models import Domain
+from extensions.caches import TieredCache
+
+tenant_cache = TieredCache('tenant', max_size=1024, local_timeout=60, shared_timeout=600)
+
+
+def get_cached_tenant(hostname):
+    """根据域名获取租户, 未命中时查询数据库"""
+
+    def load_tenant():
+        return Domain.objects.select_related('tenant').get(domain=hostname).tenant
+
+    tenant = tenant_cache.get_or_set(hostname, load_tenant)
+
+    # 返回副本, 避免请求中的修改污染缓存
+    return copy.copy(tenant)
+
+
+def invalidate_hostname(*hostnames):
+    """事务提交后失效域名缓存"""
+
+    hostname_list = list(hostnames)
+
+    def delete_keys():
+        for hostname in hostname_list:
+            tenant_cache.delete(hostname)
+
+    if hostname_list:
+        transaction.on_commit(delete_keys)
+
+
+__all__ = [
+    'get_cached_tenant',
+    'invalidate_hostname',
+]
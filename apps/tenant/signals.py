@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.tenant.caches import invalidate_hostname
+from apps.tenant.models import Domain, Tenant
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(pre_delete, sender=Tenant)
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    invalidate_hostname(*instance.domains.values_list('domain', flat=True))
+
+
+@receiver(pre_save, sender=Domain)
+def invalidate_previous_domain_cache(sender, instance, **kwargs):
+    if instance.pk and (domain := Domain.objects.filter(pk=instance.pk).values_list('domain', flat=True).first()):
+        invalidate_hostname(domain)
+
+
+@receiver(post_save, sender=Domain)
+@receiver(post_delete, sender=Domain)
+def invalidate_domain_cache(sender, instance, **kwargs):
+    invalidate_hostname(instance.domain)
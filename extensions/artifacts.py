@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.utils import timezone
+
+
+class ArtifactStore:
+    """内容寻址的压缩文件存储
+
+    文件按未压缩内容的 SHA-256 命名, gzip 压缩后保存为 {目录}/{哈希前两位}/{哈希}{后缀}.gz, 内容相同的文件只保存一次;
+    模型的 FileField 直接引用存储名称, 多条记录共享同一个文件. 文件不随记录删除, 由 sweep 清理不再被引用的文件.
+    保存文件到提交引用期间持有目录的共享锁, 清理时持有排他锁, 清理不会删除刚被复用、引用尚未提交的文件.
+    """
+
+    compress_level = 6
+    block_size = 64 * 1024
+
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+
+    def compress(self, file):
+        """压缩文件, 返回 (压缩后的临时文件, 未压缩内容的哈希)"""
+
+        sha256 = hashlib.sha256()
+        temp_file = tempfile.TemporaryFile()
+        try:
+            # mtime 固定为 0, 相同内容的压缩结果一致
+            with gzip.GzipFile(fileobj=temp_file, mode='wb', compresslevel=self.compress_level, mtime=0) as gzip_file:
+                file.seek(0)
+                while data := file.read(self.block_size):
+                    sha256.update(data)
+                    gzip_file.write(data)
+        except Exception:
+            temp_file.close()
+            raise
+
+        temp_file.seek(0)
+        return temp_file, sha256.hexdigest()
+
+    @staticmethod
+    def get_name(directory, digest, suffix):
+        return f'{directory}/{digest[:2]}/{digest}{suffix}.gz'
+
+    @staticmethod
+    @contextmanager
+    def lock(directory, shared=False):
+        """目录锁(PostgreSQL 会话级咨询锁)"""
+
+        function = 'pg_advisory_lock_shared' if shared else 'pg_advisory_lock'
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {function}(hashtext(%s))', [directory])
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT {function.replace("_lock", "_unlock")}(hashtext(%s))', [directory])
+
+    def touch(self, name):
+        """刷新文件的修改时间, 存储没有本地路径或文件已删除时返回 False"""
+
+        try:
+            os.utime(self.storage.path(name))
+        except (NotImplementedError, FileNotFoundError):
+            return False
+        return True
+
+    def save(self, directory, file, suffix=''):
+        """保存文件, 返回存储名称; 相同内容的文件已存在时刷新修改时间并返回已有名称"""
+
+        temp_file, digest = self.compress(file)
+        with temp_file:
+            name = self.get_name(directory, digest, suffix)
+            if not (self.storage.exists(name) and self.touch(name)):
+                name = self.storage.save(name, File(temp_file))
+        return name
+
+    def iter_names(self, directory):
+        try:
+            subdirectory_list, _ = self.storage.listdir(directory)
+        except FileNotFoundError:
+            return
+
+        for subdirectory in subdirectory_list:
+            _, file_list = self.storage.listdir(f'{directory}/{subdirectory}')
+            for file_name in file_list:
+                yield f'{directory}/{subdirectory}/{file_name}'
+
+    def sweep(self, directory, referenced_names, grace_period=None):
+        """删除目录中未被引用的文件, 返回删除数量
+
+        调用方在 lock(directory) 内查询 referenced_names 并清理; grace_period 内保存或复用的文件不删除.
+        """
+
+        if grace_period is None:
+            grace_period = timedelta(seconds=settings.ARTIFACT_SWEEP_GRACE_PERIOD)
+
+        referenced_names = set(referenced_names)
+        expired_time = timezone.now() - grace_period
+        delete_count = 0
+        for name in self.iter_names(directory):
+            if name in referenced_names or self.storage.get_modified_time(name) > expired_time:
+                continue
+
+            self.storage.delete(name)
+            delete_count += 1
+        return delete_count
+
+
+artifact_store = ArtifactStore()
+
+
+__all__ = [
+    'ArtifactStore',
+    'artifact_store',
+]
@@ -2,6 +2,7 @@ from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
+from apps.system.caches import get_cached_user
 from apps.system.models import User
 from extensions.exceptions import NotAuthenticated
 
@@ -21,7 +22,7 @@ class JWTAuthenticationEx(JWTAuthentication):
 
         try:
             validated_token = self.get_validated_token(raw_token)
-            user = User.objects.get(id=validated_token['user_id'], is_deleted=False)
+            user = get_cached_user(validated_token['user_id'])
         except KeyError as e:
             raise NotAuthenticated('令牌不包含用户标识') from e
         except (InvalidToken, TokenError) as e:
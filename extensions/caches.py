@@ -0,0 +1,133 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+SHARED_CACHE_ALIAS = 'shared'
+
+
+class LocalCache:
+    """进程内 LRU 缓存"""
+
+    def __init__(self, max_size=1024, timeout=10):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if (item := self._items.get(key)) is None:
+                return None
+
+            value, expiry_time = item
+            if expiry_time < time.monotonic():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.timeout)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class TieredCache:
+    """两级缓存, 进程内 LRU + 共享缓存(配置 CACHE_URL 后启用 Redis)
+
+    共享缓存为每个键保存版本号, 失效时更新版本号; 缓存值连同写入时的版本号一起保存, 读取时版本号与当前版本号不一致视为未命中.
+    命中进程内缓存前也要读取一次版本号, 失效对所有进程(gunicorn、daphne、celery)立即生效.
+    未配置共享缓存时(单进程开发环境)只使用进程内缓存, 失效只作用于当前进程.
+    """
+
+    def __init__(self, prefix, max_size=1024, local_timeout=10, shared_timeout=300):
+        self.prefix = prefix
+        self.local_cache = LocalCache(max_size=max_size, timeout=local_timeout)
+        self.shared_timeout = shared_timeout
+
+    @property
+    def shared_cache(self):
+        if SHARED_CACHE_ALIAS not in settings.CACHES:
+            return None
+        return caches[SHARED_CACHE_ALIAS]
+
+    def make_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    @staticmethod
+    def get_version(shared_cache, key):
+        version_key = f'{key}:version'
+        if (version := shared_cache.get(version_key)) is None:
+            # 版本号不存在(首次使用或被淘汰)时生成新版本号, 之前写入的值全部失效
+            shared_cache.add(version_key, uuid.uuid4().hex, None)
+            version = shared_cache.get(version_key)
+        return version
+
+    def get_or_set(self, key, default):
+        """返回缓存值, 未命中时调用 default() 计算并写入
+
+        计算前读取版本号, 计算期间发生的失效会更新版本号, 计算出的旧值随旧版本号写入, 不会被后续读取使用.
+        """
+
+        key = self.make_key(key)
+        shared_cache = self.shared_cache
+        try:
+            version = self.get_version(shared_cache, key) if shared_cache is not None else None
+        except Exception:
+            # 共享缓存不可用时无法确认进程内缓存是否有效
+            return default()
+
+        if (item := self.local_cache.get(key)) is not None and item[1] == version:
+            return item[0]
+
+        if shared_cache is not None:
+            try:
+                item = shared_cache.get(key)
+            except Exception:
+                item = None
+
+            if item is not None and item[1] == version:
+                self.local_cache.set(key, item)
+                return item[0]
+
+        value = default()
+        item = (value, version)
+        self.local_cache.set(key, item)
+        if shared_cache is not None:
+            try:
+                shared_cache.set(key, item, self.shared_timeout)
+            except Exception:
+                pass
+        return value
+
+    def delete(self, key):
+        key = self.make_key(key)
+        self.local_cache.delete(key)
+
+        if (shared_cache := self.shared_cache) is not None:
+            try:
+                shared_cache.set(f'{key}:version', uuid.uuid4().hex, None)
+                shared_cache.delete(key)
+            except Exception:
+                pass
+
+
+__all__ = [
+    'LocalCache',
+    'TieredCache',
+]
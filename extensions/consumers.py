@@ -20,6 +20,9 @@ class AsyncJsonWebsocketConsumerEx(AsyncJsonWebsocketConsumer):
     async def init_data(self):
         ...
 
+    def get_group_names(self):
+        return [f'{self.consumer_code}.{self.user.id}']
+
     async def connect(self):
         await self.accept()
 
@@ -37,7 +40,8 @@ class AsyncJsonWebsocketConsumerEx(AsyncJsonWebsocketConsumer):
                 raise ValidationError('账号已禁用')
 
             await self.init_data()
-            await self.channel_layer.group_add(f'{self.consumer_code}.{self.user.id}', self.channel_name)
+            for group_name in self.get_group_names():
+                await self.channel_layer.group_add(group_name, self.channel_name)
 
         except NotAuthenticated as error:
             await self.send_json({'status_code': 401, 'detail': str(error)}, close=True)
@@ -48,8 +52,9 @@ class AsyncJsonWebsocketConsumerEx(AsyncJsonWebsocketConsumer):
             await self.send_json({'status_code': 500, 'detail': str(error)}, close=True)
 
     async def disconnect(self, close_code):
-        if self.user:
-            await self.channel_layer.group_discard(f'{self.consumer_code}.{self.user.id}', self.channel_name)
+        if self.user and self.tenant:
+            for group_name in self.get_group_names():
+                await self.channel_layer.group_discard(group_name, self.channel_name)
 
     @classmethod
     async def send_data(cls, user, data):
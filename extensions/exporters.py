@@ -0,0 +1,101 @@
+import json
+import tempfile
+
+from django.core.files import File
+
+
+class JSONArrayWriter:
+    """增量写入 JSON 数组"""
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+        self.file.write(b'[')
+
+    def write_list(self, item_list):
+        for item in item_list:
+            if self.count > 0:
+                self.file.write(b',')
+            self.file.write(json.dumps(item, ensure_ascii=False, default=str).encode('utf-8'))
+            self.count += 1
+
+    def close(self):
+        self.file.write(b']')
+
+
+class NDJSONWriter:
+    """增量写入 NDJSON, 每行一条数据"""
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def write_list(self, item_list):
+        for item in item_list:
+            self.file.write(json.dumps(item, ensure_ascii=False, default=str).encode('utf-8'))
+            self.file.write(b'\n')
+            self.count += 1
+
+    def close(self):
+        pass
+
+
+class ExportEngine:
+    """流式导出引擎
+
+    分块读取查询集(建议使用 values() 减少模型实例化开销), 每块经 transform 转换后增量写入临时文件,
+    内存占用只与块大小有关. 指定 id_list 时按 ID 分块查询并保持 id_list 的顺序, 否则使用服务端游标迭代.
+    """
+
+    chunk_size = 2000
+
+    def __init__(self, queryset, transform, id_list=None, chunk_size=None, writer_class=JSONArrayWriter,
+                 progress_callback=None):
+        self.queryset = queryset
+        self.transform = transform
+        self.id_list = id_list
+        self.chunk_size = chunk_size or self.chunk_size
+        self.writer_class = writer_class
+        self.progress_callback = progress_callback
+
+    def iter_chunks(self):
+        if self.id_list is None:
+            chunk = []
+            for row in self.queryset.iterator(chunk_size=self.chunk_size):
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+            return
+
+        for index in range(0, len(self.id_list), self.chunk_size):
+            chunk_ids = self.id_list[index:index + self.chunk_size]
+            row_map = {row['id']: row for row in self.queryset.filter(id__in=chunk_ids)}
+            yield [row_map[instance_id] for instance_id in chunk_ids if instance_id in row_map]
+
+    def run(self):
+        """执行导出, 返回 (导出文件, 导出条数), 导出文件位于临时文件中, 由调用方关闭"""
+
+        temp_file = tempfile.TemporaryFile()
+        try:
+            writer = self.writer_class(temp_file)
+            for chunk in self.iter_chunks():
+                writer.write_list(self.transform(chunk))
+                if self.progress_callback:
+                    self.progress_callback(writer.count)
+            writer.close()
+        except Exception:
+            temp_file.close()
+            raise
+
+        temp_file.seek(0)
+        return File(temp_file), writer.count
+
+
+__all__ = [
+    'JSONArrayWriter',
+    'NDJSONWriter',
+    'ExportEngine',
+]
@@ -1,9 +1,11 @@
 from datetime import datetime
 
+from django.db import connection, transaction
 from rest_framework import serializers
 from rest_framework.serializers import Serializer
 
 from apps.system.models import ModelField
+from extensions.caches import TieredCache
 from extensions.exceptions import ValidationError
 
 
@@ -280,59 +282,118 @@ class MultipleChoiceFieldProperty(Serializer):
         return value
 
 
+property_serializer_map = {
+    ModelField.DataType.TEXT: TextFieldProperty,
+    ModelField.DataType.NUMBER: NumberFieldProperty,
+    ModelField.DataType.BOOLEAN: BooleanFieldProperty,
+    ModelField.DataType.DATE: DateFieldProperty,
+    ModelField.DataType.TIME: TimeFieldProperty,
+    ModelField.DataType.LIST: ListFieldProperty,
+    ModelField.DataType.SINGLE_CHOICE: SingleChoiceFieldProperty,
+    ModelField.DataType.MULTIPLE_CHOICE: MultipleChoiceFieldProperty,
+}
+
+
+def export_raw_value(model_field, value):
+    return value
+
+
+def export_boolean_value(model_field, value):
+    if value is True:
+        return model_field.property['true_label']
+    if value is False:
+        return model_field.property['false_label']
+    return None
+
+
+def export_list_value(model_field, value):
+    return ';'.join(value) if value else ''
+
+
+export_converter_map = {
+    ModelField.DataType.TEXT: export_raw_value,
+    ModelField.DataType.NUMBER: export_raw_value,
+    ModelField.DataType.BOOLEAN: export_boolean_value,
+    ModelField.DataType.DATE: export_raw_value,
+    ModelField.DataType.TIME: export_raw_value,
+    ModelField.DataType.LIST: export_list_value,
+    ModelField.DataType.SINGLE_CHOICE: export_raw_value,
+    ModelField.DataType.MULTIPLE_CHOICE: export_list_value,
+}
+
+
+class ModelFieldSchema:
+    """模型字段结构, 编译时将每个字段解析为对应的校验函数和导出列"""
+
+    def __init__(self, model_field_list):
+        self.model_field_list = model_field_list
+        self.validator_list = [
+            (model_field.number, model_field, property_serializer_map[model_field.type].validate_data)
+            for model_field in model_field_list
+        ]
+        self.column_list = [
+            (model_field.name, model_field.number, model_field, export_converter_map[model_field.type])
+            for model_field in model_field_list
+        ]
+
+    def __getstate__(self):
+        # 共享缓存中只保存字段列表, 加载后在本进程重新编译
+        return {'model_field_list': self.model_field_list}
+
+    def __setstate__(self, state):
+        self.__init__(state['model_field_list'])
+
+    def validate(self, data):
+        for field_number, model_field, validate_data in self.validator_list:
+            data[field_number] = validate_data(model_field, data.get(field_number, None))
+        return data
+
+    def export(self, data):
+        return {name: convert(model_field, data.get(number)) for name, number, model_field, convert in self.column_list}
+
+    def export_list(self, data_list):
+        column_list = self.column_list
+        return [
+            {name: convert(model_field, data.get(number)) for name, number, model_field, convert in column_list}
+            for data in data_list
+        ]
+
+
+model_field_schema_cache = TieredCache('model_field', max_size=256)
+
+
+def get_model_field_schema(model):
+    """获取模型字段结构, 按租户和模型缓存, 字段变更时由信号失效"""
+
+    def load_schema():
+        return ModelFieldSchema(list(ModelField.live.filter(model=model).order_by('-priority', 'id')))
+
+    return model_field_schema_cache.get_or_set(f'{connection.schema_name}:{model}', load_schema)
+
+
+def invalidate_model_field_schema(*models):
+    """事务提交后失效模型字段结构"""
+
+    key_list = [f'{connection.schema_name}:{model}' for model in set(models)]
+
+    def delete_keys():
+        for key in key_list:
+            model_field_schema_cache.delete(key)
+
+    if key_list:
+        transaction.on_commit(delete_keys)
+
+
 def validate_custom_data(model, data):
-    for model_field in ModelField.objects.filter(model=model, is_deleted=False):
-        field_number = model_field.number
-        field_value = data.get(field_number, None)
-        if model_field.type == ModelField.DataType.TEXT:
-            data[field_number] = TextFieldProperty.validate_data(model_field, field_value)
-        elif model_field.type == ModelField.DataType.NUMBER:
-            data[field_number] = NumberFieldProperty.validate_data(model_field, field_value)
-        elif model_field.type == ModelField.DataType.BOOLEAN:
-            data[field_number] = BooleanFieldProperty.validate_data(model_field, field_value)
-        elif model_field.type == ModelField.DataType.DATE:
-            data[field_number] = DateFieldProperty.validate_data(model_field, field_value)
-        elif model_field.type == ModelField.DataType.TIME:
-            data[field_number] = TimeFieldProperty.validate_data(model_field, field_value)
-        elif model_field.type == ModelField.DataType.LIST:
-            data[field_number] = ListFieldProperty.validate_data(model_field, field_value)
-        elif model_field.type == ModelField.DataType.SINGLE_CHOICE:
-            data[field_number] = SingleChoiceFieldProperty.validate_data(model_field, field_value)
-        elif model_field.type == ModelField.DataType.MULTIPLE_CHOICE:
-            data[field_number] = MultipleChoiceFieldProperty.validate_data(model_field, field_value)
-    return data
+    return get_model_field_schema(model).validate(data)
 
 
 def export_extension_data(model, data):
-    model_field_set = ModelField.objects.filter(model=model, is_deleted=False).order_by('-priority')
-
-    extension_item = {}
-    for model_field in model_field_set:
-        if model_field.type == ModelField.DataType.TEXT:
-            extension_item[model_field.name] = data.get(model_field.number, None)
-        elif model_field.type == ModelField.DataType.NUMBER:
-            extension_item[model_field.name] = data.get(model_field.number, None)
-        elif model_field.type == ModelField.DataType.BOOLEAN:
-            value = data.get(model_field.number, None)
-            if value == True:
-                extension_item[model_field.name] = model_field.property['true_label']
-            elif value == False:
-                extension_item[model_field.name] = model_field.property['false_label']
-            else:
-                extension_item[model_field.name] = None
-        elif model_field.type == ModelField.DataType.DATE:
-            extension_item[model_field.name] = data.get(model_field.number, None)
-        elif model_field.type == ModelField.DataType.TIME:
-            extension_item[model_field.name] = data.get(model_field.number, None)
-        elif model_field.type == ModelField.DataType.LIST:
-            value = data.get(model_field.number, [])
-            extension_item[model_field.name] = ';'.join(value)
-        elif model_field.type == ModelField.DataType.SINGLE_CHOICE:
-            value = data.get(model_field.number, None)
-        elif model_field.type == ModelField.DataType.MULTIPLE_CHOICE:
-            value = data.get(model_field.number, [])
-            extension_item[model_field.name] = ';'.join(value)
-    return extension_item
+    return get_model_field_schema(model).export(data)
+
+
+def export_extension_data_list(model, data_list):
+    return get_model_field_schema(model).export_list(data_list)
 
 
 __all__ = [
@@ -344,6 +405,10 @@ __all__ = [
     'ListFieldProperty',
     'SingleChoiceFieldProperty',
     'MultipleChoiceFieldProperty',
+    'ModelFieldSchema',
+    'get_model_field_schema',
+    'invalidate_model_field_schema',
     'validate_custom_data',
     'export_extension_data',
+    'export_extension_data_list',
 ]
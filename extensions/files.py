@@ -0,0 +1,231 @@
+import gzip
+import mimetypes
+import os
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe
+from django.utils.module_loading import import_string
+
+from extensions.exceptions import ValidationError
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileDelivery(ABC):
+    """文件下载
+
+    视图只负责鉴权, 调用 serve(request, file, filename) 返回响应; file 为 FieldFile, 文件名为存储中的相对路径.
+    存储名称以 .gz 结尾的文件为 gzip 压缩文件(见 extensions.artifacts), 客户端接受 gzip 时直接发送压缩内容.
+    """
+
+    @abstractmethod
+    def serve(self, request, file, filename, as_attachment=True):
+        ...
+
+    @staticmethod
+    def is_compressed(file):
+        return file.name.endswith('.gz')
+
+    @staticmethod
+    def accepts_gzip(request):
+        """先解析全部编码和 q 值再判断: 显式的 gzip 优先于 *, q=0 表示拒绝"""
+
+        quality_map = {}
+        for item in request.headers.get('Accept-Encoding', '').split(','):
+            coding, *param_list = [part.strip() for part in item.split(';')]
+            if not coding:
+                continue
+
+            quality = 1.0
+            for param in param_list:
+                name, _, value = param.partition('=')
+                if name.strip().lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            quality_map[coding.lower()] = quality
+
+        for coding in ('gzip', 'x-gzip', '*'):
+            if coding in quality_map:
+                return quality_map[coding] > 0
+        return False
+
+    def get_content_encoding(self, request, file):
+        """发送压缩内容时返回 gzip, 否则返回 None"""
+
+        return 'gzip' if self.is_compressed(file) and self.accepts_gzip(request) else None
+
+    @staticmethod
+    def get_content_type(filename, file=None):
+        content_type, _ = mimetypes.guess_type(filename)
+        if content_type is None and file is not None:
+            # 下载文件名没有扩展名时按存储名称推断, x.json.gz 推断为 application/json
+            content_type, _ = mimetypes.guess_type(file.name)
+        return content_type or 'application/octet-stream'
+
+    def set_headers(self, response, filename, as_attachment, file=None):
+        response['Content-Type'] = self.get_content_type(filename, file)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return response
+
+
+class AccelRedirectFileDelivery(FileDelivery):
+    """nginx X-Accel-Redirect, 文件由 nginx 的 internal location(FILE_DELIVERY_INTERNAL_URL)发送
+
+    Range 和条件请求由 nginx 处理, POST 请求内部跳转后 nginx 按 GET 读取文件.
+    压缩文件跳转到去掉 .gz 的地址, 由 internal location 的 gzip_static always 发送压缩内容, 客户端不接受 gzip 时由 gunzip 解压.
+    """
+
+    def serve(self, request, file, filename, as_attachment=True):
+        response = self.set_headers(HttpResponse(), filename, as_attachment, file)
+        name = file.name[:-len('.gz')] if self.is_compressed(file) else file.name
+        response['X-Accel-Redirect'] = f'{settings.FILE_DELIVERY_INTERNAL_URL.rstrip("/")}/{quote(name)}'
+        return response
+
+
+class SendfileFileDelivery(FileDelivery):
+    """X-Sendfile(Apache mod_xsendfile / lighttpd), 文件由前端服务器按绝对路径发送
+
+    压缩文件在客户端不接受 gzip 时由 PythonFileDelivery 解压发送.
+    """
+
+    def serve(self, request, file, filename, as_attachment=True):
+        content_encoding = self.get_content_encoding(request, file)
+        if self.is_compressed(file) and content_encoding is None:
+            return PythonFileDelivery().serve(request, file, filename, as_attachment)
+
+        response = self.set_headers(HttpResponse(), filename, as_attachment, file)
+        response['X-Sendfile'] = file.path
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+            patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+
+class PythonFileDelivery(FileDelivery):
+    """由 Python 读取文件, 用于开发环境或没有前端服务器的部署
+
+    支持 ETag / Last-Modified 条件请求(304)和单个 Range 请求(206 / 416), 多个 Range 时返回完整文件.
+    压缩文件在客户端不接受 gzip 时边读边解压, 不支持 Range.
+    """
+
+    block_size = 64 * 1024
+
+    @staticmethod
+    def get_etag(stat, content_encoding=None):
+        suffix = f'-{content_encoding}' if content_encoding else ''
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{suffix}"'
+
+    @staticmethod
+    def is_not_modified(request, etag, stat):
+        if if_none_match := request.headers.get('If-None-Match'):
+            etag_list = parse_etags(if_none_match)
+            return '*' in etag_list or etag in etag_list
+
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return if_modified_since is not None and int(stat.st_mtime) <= if_modified_since
+
+    @staticmethod
+    def get_range(request, etag, stat):
+        """返回 (起始位置, 结束位置), 不是 Range 请求或 If-Range 不匹配时返回 None, 无法满足时返回 False"""
+
+        if not (match := RANGE_PATTERN.match(request.headers.get('Range', '').strip())):
+            return None
+
+        if if_range := request.headers.get('If-Range'):
+            if_range_date = parse_http_date_safe(if_range)
+            if if_range != etag and (if_range_date is None or int(stat.st_mtime) > if_range_date):
+                return None
+
+        start, end = match.groups()
+        size = stat.st_size
+        if not start and not end:
+            return None
+        if not start:
+            # 后缀范围: 最后 N 个字节
+            length = int(end)
+            if length == 0 or size == 0:
+                return False
+            return max(size - length, 0), size - 1
+
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+        if start >= size or start > end:
+            return False
+        return start, end
+
+    def iter_file(self, file, start=0, length=None):
+        with file:
+            file.seek(start)
+            while length is None or length > 0:
+                if not (data := file.read(self.block_size if length is None else min(self.block_size, length))):
+                    break
+                if length is not None:
+                    length -= len(data)
+                yield data
+
+    def serve(self, request, file, filename, as_attachment=True):
+        stat = os.stat(file.path)
+        content_encoding = self.get_content_encoding(request, file)
+        decompress = self.is_compressed(file) and content_encoding is None
+        etag = self.get_etag(stat, content_encoding)
+        last_modified = http_date(stat.st_mtime)
+
+        if request.method in ('GET', 'HEAD') and self.is_not_modified(request, etag, stat):
+            response = HttpResponseNotModified()
+        elif decompress:
+            response = StreamingHttpResponse(self.iter_file(gzip.open(file.path, 'rb')))
+            self.set_headers(response, filename, as_attachment, file)
+        elif (byte_range := self.get_range(request, etag, stat)) is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(self.iter_file(open(file.path, 'rb'), start, end - start + 1), status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+            self.set_headers(response, filename, as_attachment, file)
+        else:
+            response = FileResponse(open(file.path, 'rb'), as_attachment=as_attachment, filename=filename,
+                                    content_type=self.get_content_type(filename, file))
+            response.block_size = self.block_size
+
+        response['Accept-Ranges'] = 'none' if decompress else 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+        if self.is_compressed(file):
+            patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+
+@lru_cache
+def get_file_delivery():
+    return import_string(settings.FILE_DELIVERY_BACKEND)()
+
+
+def serve_file(request, file, filename, as_attachment=True, missing_message='文件不存在'):
+    """使用 FILE_DELIVERY_BACKEND 返回下载响应, 文件不存在时抛出 ValidationError"""
+
+    if not file or not file.storage.exists(file.name):
+        raise ValidationError(missing_message)
+    return get_file_delivery().serve(request, file, filename, as_attachment)
+
+
+__all__ = [
+    'FileDelivery',
+    'AccelRedirectFileDelivery',
+    'SendfileFileDelivery',
+    'PythonFileDelivery',
+    'get_file_delivery',
+    'serve_file',
+]
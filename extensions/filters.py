@@ -0,0 +1,88 @@
+import operator
+from functools import reduce
+
+from django.db.models import CharField, Exists, Lookup, OuterRef, Q, TextField
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.filters import SearchFilter
+
+from extensions.models import get_prefix_index_fields
+
+
+@CharField.register_lookup
+@TextField.register_lookup
+class TrigramIContains(Lookup):
+    """ILIKE '%值%'
+
+    Django 的 icontains 在 PostgreSQL 中编译为 UPPER(列) LIKE UPPER(值), 无法使用列上的 gin_trgm_ops 索引,
+    改用 ILIKE 后可以命中三元组索引.
+    """
+
+    lookup_name = 'trgm_icontains'
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        rhs_params = [f'%{connection.ops.prep_for_like_query(param)}%' for param in rhs_params]
+        return f'{lhs_sql} ILIKE {rhs_sql}', [*lhs_params, *rhs_params]
+
+
+class SearchFilterEx(SearchFilter):
+    """搜索过滤, 模糊匹配使用 ILIKE 以命中 pg_trgm 三元组索引
+
+    搜索词少于 3 个字符时无法提取三元组, 三元组索引不可用(常见于中文姓名), 短搜索词改为在 prefix_index 字段上前缀匹配、
+    在唯一字段上精确匹配, 均可命中 B 树索引; 模型没有这类字段时仍使用模糊匹配.
+    前缀语法与 SearchFilter 一致(^ 前缀匹配, = 精确匹配).
+    """
+
+    min_trigram_length = 3
+
+    def construct_search(self, field_name, queryset):
+        lookup = super().construct_search(field_name, queryset)
+        if lookup.endswith('__icontains'):
+            lookup = f'{lookup[:-len("__icontains")]}__trgm_icontains'
+        return lookup
+
+    def construct_short_search(self, field_name, queryset):
+        """短搜索词的查询条件, 字段不支持时返回 None"""
+
+        if field_name[0] in self.lookup_prefixes or LOOKUP_SEP in field_name or field_name in queryset.query.annotations:
+            return None
+
+        if field_name in get_prefix_index_fields(queryset.model):
+            return f'{field_name}__istartswith'
+        if queryset.model._meta.get_field(field_name).unique:
+            return f'{field_name}__exact'
+        return None
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        search_fields = [str(search_field) for search_field in search_fields]
+        orm_lookups = [self.construct_search(search_field, queryset) for search_field in search_fields]
+        short_orm_lookups = [lookup for search_field in search_fields
+                             if (lookup := self.construct_short_search(search_field, queryset))]
+
+        condition_list = []
+        for term in search_terms:
+            lookups = orm_lookups
+            if len(term) < self.min_trigram_length and short_orm_lookups:
+                lookups = short_orm_lookups
+            condition_list.append(reduce(operator.or_, (Q(**{lookup: term}) for lookup in lookups)))
+
+        base = queryset
+        queryset = queryset.filter(reduce(operator.and_, condition_list))
+
+        # 与 SearchFilter 一致, 跨多对多关系搜索时使用 EXISTS 去重
+        if self.must_call_distinct(queryset, search_fields):
+            queryset = base.filter(Exists(queryset.filter(pk=OuterRef('pk'))))
+        return queryset
+
+
+__all__ = [
+    'TrigramIContains',
+    'SearchFilterEx',
+]
@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.models import Model
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+from extensions.models import find_unique_conflicts, get_archive_unique_field_groups
+
+
+class ImportEngine:
+    """批量导入引擎
+
+    1. 一次 IN 查询预取文件中引用的全部编号
+    2. 逐行使用序列化器校验(跳过逐行唯一性查询), 唯一约束在全部数据校验后批量检查
+    3. 全部校验通过后在同一事务中分批 bulk_create / bulk_update, 存在错误时不写入任何数据
+
+    只适用于没有可写多对多字段、create / update 无额外逻辑的序列化器; 新建数据的编号由 number_generator(count) 批量生成.
+    """
+
+    chunk_size = 1000
+
+    def __init__(self, model, serializer_class, number_generator, context=None, chunk_size=None, progress_callback=None):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.number_generator = number_generator
+        self.context = {**(context or {}), 'batch_import': True}
+        self.chunk_size = chunk_size or self.chunk_size
+        self.progress_callback = progress_callback
+
+    @staticmethod
+    def format_errors(index, serializer, errors):
+        message_list = []
+        for field_name, detail_list in errors.items():
+            field = serializer.fields.get(field_name)
+            label = f'{field.label} ' if field and field.label else ''
+            for detail in detail_list if isinstance(detail_list, list) else [detail_list]:
+                message_list.append(f'第 {index + 1} 行: {label}{detail}')
+        return message_list
+
+    def get_field_value(self, instance, validated_data, field_name):
+        if field_name in validated_data:
+            value = validated_data[field_name]
+        else:
+            value = getattr(instance, self.model._meta.get_field(field_name).attname, None)
+        return value.pk if isinstance(value, Model) else value
+
+    def load_instances(self, row_list):
+        number_set = {row['number'] for row in row_list if isinstance(row, dict) and row.get('number')}
+        return {instance.number: instance for instance in self.model.objects.filter(number__in=number_set)}
+
+    def validate(self, row_list):
+        """校验数据, 返回 (校验结果列表, 错误信息列表), 校验结果为 (实例, 校验后的数据)"""
+
+        instance_map = self.load_instances(row_list)
+        item_list = []
+        error_message_list = []
+
+        for index, row in enumerate(row_list):
+            # 按行号上报进度(已校验 index 行), 与该行是否校验通过无关
+            if self.progress_callback and index and index % self.chunk_size == 0:
+                self.progress_callback(index)
+
+            if not isinstance(row, dict):
+                error_message_list.append(f'第 {index + 1} 行: 数据格式错误')
+                continue
+
+            instance = None
+            if number := row.get('number'):
+                if not (instance := instance_map.get(number)):
+                    error_message_list.append(f'第 {index + 1} 行: 编号不存在')
+                    continue
+
+                if instance.is_deleted:
+                    error_message_list.append(f'第 {index + 1} 行: 数据已删除')
+                    continue
+
+            serializer = self.serializer_class(instance=instance, data=row, context=self.context)
+            try:
+                is_valid = serializer.is_valid()
+            except APIException as error:
+                error_message_list.append(f'第 {index + 1} 行: {error.detail}')
+                continue
+
+            if not is_valid:
+                error_message_list.extend(self.format_errors(index, serializer, serializer.errors))
+                continue
+
+            item_list.append((index, instance, serializer.validated_data))
+
+        # 唯一约束批量检查
+        unique_field_set = {field for field_group in get_archive_unique_field_groups(self.model) for field in field_group}
+        unique_item_list = [
+            (instance.id if instance else None, {
+                field: self.get_field_value(instance, validated_data, field) for field in unique_field_set
+            })
+            for _, instance, validated_data in item_list
+        ]
+        for item_index, field_group in sorted(find_unique_conflicts(self.model, unique_item_list).items()):
+            label = '/'.join(str(self.model._meta.get_field(field).verbose_name) for field in field_group)
+            error_message_list.append(f'第 {item_list[item_index][0] + 1} 行: 该{label}已被使用')
+
+        return [(instance, validated_data) for _, instance, validated_data in item_list], error_message_list
+
+    @transaction.atomic
+    def save(self, item_list):
+        """分批写入数据, 返回写入条数"""
+
+        create_list = [validated_data for instance, validated_data in item_list if instance is None]
+        update_list = [(instance, validated_data) for instance, validated_data in item_list if instance is not None]
+
+        if create_list:
+            number_list = self.number_generator(len(create_list))
+            self.model.objects.bulk_create(
+                [self.model(**validated_data, number=number) for validated_data, number in zip(create_list, number_list)],
+                batch_size=self.chunk_size,
+            )
+
+        if update_list:
+            update_fields = {field for _, validated_data in update_list for field in validated_data}
+            has_update_time = any(field.name == 'update_time' for field in self.model._meta.concrete_fields)
+            if has_update_time:
+                update_fields.add('update_time')
+
+            update_time = timezone.now()
+            instance_list = []
+            for instance, validated_data in update_list:
+                for field, value in validated_data.items():
+                    setattr(instance, field, value)
+                if has_update_time:
+                    instance.update_time = update_time
+                instance_list.append(instance)
+
+            self.model.objects.bulk_update(instance_list, sorted(update_fields), batch_size=self.chunk_size)
+
+        return len(item_list)
+
+    def run(self, row_list):
+        """执行导入, 返回 (导入条数, 错误信息列表), 存在错误时导入条数为 0"""
+
+        item_list, error_message_list = self.validate(row_list)
+        if error_message_list:
+            return 0, error_message_list
+
+        import_count = self.save(item_list)
+        if self.progress_callback:
+            self.progress_callback(import_count)
+        return import_count, []
+
+
+__all__ = [
+    'ImportEngine',
+]
@@ -2,11 +2,15 @@ from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from django.utils import timezone
-from django_tenants.utils import get_tenant_domain_model, remove_www
+from django_tenants.middleware.main import TenantMainMiddleware
+from django_tenants.utils import remove_www
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import AccessToken
 
+from apps.system.caches import get_cached_user
 from apps.system.models import User
+from apps.tenant.caches import get_cached_tenant
+from apps.tenant.models import Domain
 
 
 class TimezoneMiddleware:
@@ -21,21 +25,25 @@ class TimezoneMiddleware:
         return response
 
 
+class TenantMainMiddlewareEx(TenantMainMiddleware):
+
+    def get_tenant(self, domain_model, hostname):
+        return get_cached_tenant(hostname)
+
+
 class WebSocketAuthMiddleware:
 
     def __init__(self, inner):
         self.inner = inner
 
-    async def get_tenant(self, scope):
+    @database_sync_to_async
+    def get_tenant(self, scope):
         if not (hostname := scope['headers'].get('host')):
             return None
 
         try:
-            domain_model = get_tenant_domain_model()
-            hostname = remove_www(hostname.split(':')[0])
-            domain = await domain_model.objects.select_related('tenant').aget(domain=hostname)
-            return domain.tenant
-        except domain_model.DoesNotExist:
+            return get_cached_tenant(remove_www(hostname.split(':')[0]))
+        except Domain.DoesNotExist:
             return None
 
     @database_sync_to_async
@@ -57,7 +65,7 @@ class WebSocketAuthMiddleware:
 
         try:
             tenant.activate()
-            return User.objects.get(id=user_id)
+            return get_cached_user(user_id)
         except User.DoesNotExist:
             return None
 
@@ -71,5 +79,6 @@ class WebSocketAuthMiddleware:
 
 __all__ = [
     'TimezoneMiddleware',
+    'TenantMainMiddlewareEx',
     'WebSocketAuthMiddleware',
 ]
@@ -1,27 +1,85 @@
 from typing import Tuple
 
-from django.db import models
-from django.db.models import Manager, Model, QuerySet, UniqueConstraint
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models, transaction
+from django.db.models import F, Field, ForeignObject, Index, Lookup, Manager, Model, Q, QuerySet, UniqueConstraint
+from django.db.models.functions import Upper
 from django.utils import timezone
 
+from extensions.signals import archive_deleted, archive_restored
+
 
 class ArchiveQuerySet(QuerySet):
 
-    def delete(self) -> int:
-        return self.filter(is_deleted=False).update(is_deleted=True, delete_time=timezone.now())
+    def live(self) -> 'ArchiveQuerySet':
+        """未删除数据, 可使用 LiveIndex 部分索引"""
+
+        return self.filter(is_deleted=False)
+
+    def archived(self) -> 'ArchiveQuerySet':
+        """已删除数据, 可使用 ArchivedIndex 部分索引"""
+
+        return self.filter(is_deleted=True)
+
+    @transaction.atomic
+    def delete(self) -> Tuple[int, dict[str, int]]:
+        """批量归档, 返回值与 QuerySet.delete 一致; 归档后发送一次 archive_deleted 信号, 用于批量失效缓存"""
+
+        pk_list = list(self.live().select_for_update(of=('self',)).values_list('pk', flat=True))
+        if not pk_list:
+            return (0, {})
+
+        count = self.model._base_manager.using(self.db).filter(pk__in=pk_list).update(
+            is_deleted=True, delete_time=timezone.now())
+        archive_deleted.send(sender=self.model, pk_list=pk_list)
+        return (count, {self.model._meta.label: count})
+
+    @transaction.atomic
+    def undo_delete(self) -> Tuple[int, list[Tuple[tuple, dict]]]:
+        """批量恢复, 返回 (恢复条数, 唯一约束冲突列表)
+
+        恢复前使用 find_unique_conflicts 一次查询检查全部数据的唯一约束, 冲突列表为 (冲突的字段组, 数据字段值),
+        存在冲突时不恢复任何数据; 恢复后发送一次 archive_restored 信号.
+        """
+
+        field_set = {field for field_group in get_archive_unique_field_groups(self.model) for field in field_group}
+        row_list = list(self.archived().select_for_update(of=('self',)).values('pk', *field_set))
+        if not row_list:
+            return (0, [])
+
+        conflict_map = find_unique_conflicts(self.model, [(row['pk'], row) for row in row_list])
+        if conflict_map:
+            return (0, [(field_group, row_list[index]) for index, field_group in sorted(conflict_map.items())])
+
+        pk_list = [row['pk'] for row in row_list]
+        count = self.model._base_manager.using(self.db).filter(pk__in=pk_list).update(
+            is_deleted=False, delete_time=None)
+        archive_restored.send(sender=self.model, pk_list=pk_list)
+        return (count, [])
+
+
+class ArchiveManager(Manager.from_queryset(ArchiveQuerySet)):
+    """全部数据"""
 
 
-class ArchiveManager(Manager):
+class LiveManager(ArchiveManager):
+    """未删除数据"""
 
     def get_queryset(self) -> ArchiveQuerySet:
-        return ArchiveQuerySet(self.model, using=self._db)
+        return super().get_queryset().live()
 
 
 class ArchiveModel(Model):
-    is_deleted = models.BooleanField(default=False, db_index=True, verbose_name='删除状态')
-    delete_time = models.DateTimeField(null=True, db_index=True, verbose_name='删除时间')
+    """归档模型
+
+    is_deleted / delete_time 不单独建索引, 子类使用 LiveIndex / ArchivedIndex 按实际查询组合声明部分索引.
+    """
+
+    is_deleted = models.BooleanField(default=False, verbose_name='删除状态')
+    delete_time = models.DateTimeField(null=True, verbose_name='删除时间')
 
     objects: ArchiveManager = ArchiveManager()
+    live: LiveManager = LiveManager()
 
     class Meta:
         abstract = True
@@ -31,6 +89,7 @@ class ArchiveModel(Model):
             self.is_deleted = True
             self.delete_time = timezone.now()
             self.save(update_fields=['is_deleted', 'delete_time'])
+            return (1, {self._meta.label: 1})
         return (0, {})
 
     def undo_delete(self):
@@ -69,7 +128,142 @@ class UniqueConstraintEx(UniqueConstraint):
         )
 
 
+class LiveIndex(Index):
+    """未删除数据的部分索引(WHERE is_deleted = false), 索引只包含常用数据, 删除数据不占用索引空间"""
+
+    def __init__(self, *expressions, condition=None, **kwargs):
+        super().__init__(*expressions, condition=condition or Q(is_deleted=False), **kwargs)
+
+
+class ArchivedIndex(Index):
+    """已删除数据的部分索引(WHERE is_deleted = true), 用于回收站查询"""
+
+    def __init__(self, *expressions, condition=None, **kwargs):
+        super().__init__(*expressions, condition=condition or Q(is_deleted=True), **kwargs)
+
+
+@Field.register_lookup
+@ForeignObject.register_lookup
+class AnyLookup(Lookup):
+    """列 = ANY(%s)
+
+    值作为一个数组参数传入, SQL 与值的数量无关, 执行计划可以复用; 用于按缓存的 ID 集合过滤, 替代关联查询.
+    外键字段的查询类型不继承 Field, 需要单独注册.
+    """
+
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def get_prep_lookup(self):
+        return [self.lhs.output_field.get_prep_value(value) for value in self.rhs]
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        return f'{lhs_sql} = ANY(%s)', [*lhs_params, self.rhs]
+
+
+def trigram_index(field, name):
+    """三元组 GIN 索引, 支持 ILIKE '%值%' 模糊查询, 需要 pg_trgm 扩展(迁移中使用 CREATE_TRIGRAM_EXTENSION 创建)"""
+
+    return GinIndex(fields=[field], opclasses=['gin_trgm_ops'], name=name)
+
+
+def prefix_index(field, name):
+    """UPPER(列) text_pattern_ops B 树索引, 支持 istartswith 前缀查询(UPPER(列) LIKE UPPER('值%'))
+
+    三元组索引无法处理少于 3 个字符的搜索词(常见于中文姓名), 短搜索词使用该索引做前缀匹配, 见 SearchFilterEx.
+    """
+
+    return Index(OpClass(Upper(field), name='text_pattern_ops'), name=name)
+
+
+def get_prefix_index_fields(model):
+    """获取模型中有 prefix_index 前缀索引的字段名"""
+
+    field_set = set()
+    for index in model._meta.indexes:
+        if len(index.expressions) != 1 or index.condition is not None:
+            continue
+
+        expression = index.expressions[0]
+        if not isinstance(expression, OpClass) or expression.extra.get('name') != 'text_pattern_ops':
+            continue
+
+        function = expression.get_source_expressions()[0]
+        if isinstance(function, Upper) and isinstance(source := function.get_source_expressions()[0], F):
+            field_set.add(source.name)
+    return field_set
+
+
+# django-tenants 按 schema 执行迁移, 扩展须安装在所有租户共享的 public schema 中
+CREATE_TRIGRAM_EXTENSION = 'CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public'
+
+
+def get_archive_unique_field_groups(model):
+    """获取以 delete_time 区分的唯一约束字段组(不含 delete_time)"""
+
+    return [
+        tuple(field for field in constraint.fields if field != 'delete_time')
+        for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraintEx) and 'delete_time' in constraint.fields
+    ]
+
+
+def find_unique_conflicts(model, item_list):
+    """批量检查以 delete_time 区分的唯一约束
+
+    item_list 为 (实例 ID, 字段值字典) 列表, 新建数据的实例 ID 为 None.
+    同时检查批次内重复和与未删除数据的冲突, 所有约束合并为一次查询.
+    返回 {item_list 索引: 冲突的字段组}.
+    """
+
+    field_group_list = get_archive_unique_field_groups(model)
+    if not field_group_list or not item_list:
+        return {}
+
+    conflict_map = {}
+    condition = Q()
+    for field_group in field_group_list:
+        key_map = {}
+        for index, (instance_id, data) in enumerate(item_list):
+            key = tuple(data.get(field) for field in field_group)
+            if key in key_map:
+                conflict_map.setdefault(index, field_group)
+            else:
+                key_map[key] = index
+
+        first_field = field_group[0]
+        condition |= Q(**{f'{first_field}__in': {data.get(first_field) for _, data in item_list}})
+
+    field_set = {field for field_group in field_group_list for field in field_group}
+    row_list = list(model.objects.filter(condition, delete_time=None).values('id', *field_set))
+
+    for field_group in field_group_list:
+        existing_map = {}
+        for row in row_list:
+            existing_map.setdefault(tuple(row[field] for field in field_group), set()).add(row['id'])
+
+        for index, (instance_id, data) in enumerate(item_list):
+            existing_ids = existing_map.get(tuple(data.get(field) for field in field_group), set())
+            if existing_ids - {instance_id}:
+                conflict_map.setdefault(index, field_group)
+
+    return conflict_map
+
+
 __all__ = [
+    'ArchiveQuerySet',
+    'ArchiveManager',
+    'LiveManager',
     'ArchiveModel',
     'UniqueConstraintEx',
+    'AnyLookup',
+    'LiveIndex',
+    'ArchivedIndex',
+    'trigram_index',
+    'prefix_index',
+    'get_prefix_index_fields',
+    'CREATE_TRIGRAM_EXTENSION',
+    'get_archive_unique_field_groups',
+    'find_unique_conflicts',
 ]
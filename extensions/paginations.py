@@ -1,4 +1,29 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import datetime
+import json
+import operator
+from functools import reduce
+
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Model, Q
+from django.utils.functional import cached_property
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from extensions.exceptions import NotFound
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """游标编码, 时间保留完整微秒(DjangoJSONEncoder 截断到毫秒, 按时间排序时边界行附近的数据会被跳过)"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
 
 
 class PageNumberPaginationEx(PageNumberPagination):
@@ -8,6 +33,205 @@ class PageNumberPaginationEx(PageNumberPagination):
     page_size = 15
 
 
+class EstimatedCountPaginator(Paginator):
+    """估算总数的分页器
+
+    未过滤的查询使用 pg_class.reltuples, 过滤后的查询使用 EXPLAIN 的估算行数;
+    估算值低于 exact_count_threshold 或表未统计时执行精确 COUNT(*).
+    """
+
+    exact_count_threshold = 10000
+
+    def get_estimated_count(self):
+        query = self.object_list.query
+        with connection.cursor() as cursor:
+            if not query.where:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)',
+                               [self.object_list.model._meta.db_table])
+                row = cursor.fetchone()
+                return int(row[0]) if row else -1
+
+            sql, params = self.object_list.values('pk').query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        estimated_count = self.get_estimated_count()
+        if estimated_count < self.exact_count_threshold:
+            return self.object_list.count()
+        return estimated_count
+
+
+class EstimatedCountPaginationEx(PageNumberPaginationEx):
+    """页码分页, 大表使用估算总数"""
+
+    django_paginator_class = EstimatedCountPaginator
+
+
+class KeysetPaginationEx(BasePagination):
+    """键集(游标)分页
+
+    排序沿用视图的 ordering / ordering_fields(子类可以用 ordering 固定排序), 末尾追加 id 保证顺序唯一; 游标记录边界行的排序字段值,
+    翻页使用 WHERE 条件定位, 不执行 COUNT(*) 和 OFFSET, 翻页耗时与页码无关.
+    空值位置与 PostgreSQL 默认一致(升序在后, 降序在前).
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = '无效游标'
+    max_page_size = 60
+    page_size = 15
+    ordering = None
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        ordering = self.ordering
+        if ordering is None:
+            for filter_backend in getattr(view, 'filter_backends', []):
+                if issubclass(filter_backend, OrderingFilter):
+                    ordering = filter_backend().get_ordering(request, queryset, view)
+                    break
+
+        ordering = list(ordering or queryset.query.order_by or ['-id'])
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def encode_cursor(self, values, reverse):
+        data = json.dumps({'v': values, 'r': reverse}, cls=CursorJSONEncoder)
+        cursor = base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        if not (cursor := request.query_params.get(self.cursor_query_param)):
+            return None, False
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            values, reverse = data['v'], bool(data['r'])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.page_ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    @staticmethod
+    def get_value(instance, field):
+        value = instance
+        for name in field.split('__'):
+            if value is None:
+                break
+            value = getattr(value, name)
+        return value.pk if isinstance(value, Model) else value
+
+    @staticmethod
+    def build_condition(ordering, values, reverse):
+        """构造排在边界行之后的条件: (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ..."""
+
+        condition_list = []
+        equal_condition = Q()
+        for field, value in zip(ordering, values):
+            descending = field.startswith('-') != reverse
+            field = field.lstrip('-')
+
+            if value is None:
+                # 升序空值在后, 其后没有数据; 降序空值在前, 其后是所有非空值
+                if descending:
+                    condition_list.append(equal_condition & Q(**{f'{field}__isnull': False}))
+                equal_condition &= Q(**{f'{field}__isnull': True})
+            else:
+                if descending:
+                    after_condition = Q(**{f'{field}__lt': value})
+                else:
+                    after_condition = Q(**{f'{field}__gt': value}) | Q(**{f'{field}__isnull': True})
+                condition_list.append(equal_condition & after_condition)
+                equal_condition &= Q(**{field: value})
+
+        return reduce(operator.or_, condition_list, Q(pk__in=[]))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.page_ordering = self.get_ordering(request, queryset, view)
+        values, reverse = self.decode_cursor(request)
+
+        order_by = [field[1:] if field.startswith('-') else f'-{field}' for field in self.page_ordering] \
+            if reverse else self.page_ordering
+        queryset = queryset.order_by(*order_by)
+        if values is not None:
+            queryset = queryset.filter(self.build_condition(self.page_ordering, values, reverse))
+
+        result_list = list(queryset[:self.page_size + 1])
+        has_more = len(result_list) > self.page_size
+        result_list = result_list[:self.page_size]
+        if reverse:
+            result_list.reverse()
+
+        self.next_url = None
+        self.previous_url = None
+        if result_list:
+            first_values = [self.get_value(result_list[0], field.lstrip('-')) for field in self.page_ordering]
+            last_values = [self.get_value(result_list[-1], field.lstrip('-')) for field in self.page_ordering]
+            # 正向翻页时之前必有数据, 反向翻页时之后必有数据
+            has_next = values is not None if reverse else has_more
+            has_previous = has_more if reverse else values is not None
+            if has_next:
+                self.next_url = self.encode_cursor(last_values, False)
+            if has_previous:
+                self.previous_url = self.encode_cursor(first_values, True)
+        elif values is not None:
+            self.previous_url = remove_query_param(self.base_url, self.cursor_query_param)
+
+        return result_list
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next_url, 'previous': self.previous_url, 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '分页游标',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '每页数量',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
 __all__ = [
     'PageNumberPaginationEx',
+    'EstimatedCountPaginator',
+    'EstimatedCountPaginationEx',
+    'KeysetPaginationEx',
 ]
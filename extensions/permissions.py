@@ -1,3 +1,7 @@
+import hashlib
+import re
+
+from django.core import checks
 from django.utils import timezone
 from rest_framework.permissions import BasePermission
 
@@ -5,6 +9,91 @@ from apps.system.models import User
 from extensions.exceptions import ValidationError
 
 
+class PermissionRegistry:
+    """权限注册表
+
+    收集所有 permissions.py 中声明的权限代码, 按代码排序为每个代码分配一个位,
+    用户权限编译为位掩码后, 权限检查为 O(1) 的按位与运算.
+    """
+
+    code_pattern = re.compile(r'^[a-z_]+(\.[a-z_]+)*$')
+
+    def __init__(self):
+        self.code_map = {}
+        self.reference_map = {}
+        self._bit_map = None
+        self._version = None
+
+    def register(self, owner, *codes):
+        for code in codes:
+            self.code_map.setdefault(code, []).append(owner)
+        self._bit_map = None
+        self._version = None
+
+    def reference(self, owner, *codes):
+        for code in codes:
+            self.reference_map.setdefault(code, []).append(owner)
+
+    @property
+    def bit_map(self):
+        if self._bit_map is None:
+            self._bit_map = {code: 1 << index for index, code in enumerate(sorted(self.code_map))}
+        return self._bit_map
+
+    @property
+    def version(self):
+        """权限代码集合的摘要, 代码变化时位分配随之变化"""
+
+        if self._version is None:
+            self._version = hashlib.md5(','.join(sorted(self.code_map)).encode()).hexdigest()[:8]
+        return self._version
+
+    def get_bit(self, code):
+        return self.bit_map.get(code, 0)
+
+    def compile(self, codes):
+        """编译权限代码为位掩码, 忽略未注册的代码(如页面权限)"""
+
+        bit_map = self.bit_map
+        mask = 0
+        for code in codes:
+            mask |= bit_map.get(code, 0)
+        return mask
+
+    def has_permission(self, user, code):
+        return (user.permission_mask & self.get_bit(code)) != 0
+
+    def has_any_permission(self, user, codes):
+        return (user.permission_mask & self.compile(codes)) != 0
+
+    def check(self):
+        errors = []
+        model_code_set = {code.rsplit('.', 1)[0] for code in self.code_map if code.endswith('.query')}
+
+        for code, owner_list in self.code_map.items():
+            owner_names = ', '.join(f'{owner.__module__}.{owner.__qualname__}' for owner in owner_list)
+            if not self.code_pattern.match(code):
+                errors.append(checks.Error(f'权限代码[{code}] 格式错误', obj=owner_names, id='permissions.E001'))
+            if len(owner_list) > 1:
+                errors.append(checks.Error(f'权限代码[{code}] 重复声明', obj=owner_names, id='permissions.E002'))
+            if '.' in code and code.rsplit('.', 1)[0] not in model_code_set:
+                errors.append(checks.Error(f'权限代码[{code}] 缺少模型权限', obj=owner_names, id='permissions.E003'))
+
+        for code, owner_list in self.reference_map.items():
+            owner_names = ', '.join(f'{owner.__module__}.{owner.__qualname__}' for owner in owner_list)
+            if code not in self.code_map:
+                errors.append(checks.Error(f'权限代码[{code}] 未注册', obj=owner_names, id='permissions.E004'))
+
+        return errors
+
+
+permission_registry = PermissionRegistry()
+
+
+def check_permission_codes(app_configs, **kwargs):
+    return permission_registry.check()
+
+
 class IsAuthenticated(BasePermission):
     message = '未登陆验证'
 
@@ -41,12 +130,17 @@ class ModelPermission(BasePermission):
         'DELETE': 'delete',
     }
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.code is not None:
+            cls.method_code_map = {method: f'{cls.code}.{action}' for method, action in cls.method_map.items()}
+            permission_registry.register(cls, *cls.method_code_map.values())
+
     def has_permission(self, request, view):
         if request.user.is_manager:
             return True
 
-        code = f'{self.code}.{self.method_map[request.method]}'
-        return code in request.user.permissions
+        return permission_registry.has_permission(request.user, self.method_code_map[request.method])
 
     @property
     def OPTION(self):
@@ -59,11 +153,16 @@ class FunctionPermission(BasePermission):
     code = None
     message = '未添加操作权限'
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.code is not None:
+            permission_registry.register(cls, cls.code)
+
     def has_permission(self, request, view):
         if request.user.is_manager:
             return True
 
-        return self.code in request.user.permissions
+        return permission_registry.has_permission(request.user, self.code)
 
 
 class QueryPermission:
@@ -71,25 +170,34 @@ class QueryPermission:
 
     code = None
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.code is not None:
+            permission_registry.register(cls, cls.code)
+
     @classmethod
     def has_permission(cls, request):
         if request.user.is_manager:
             return True
 
-        return cls.code in request.user.permissions
+        return permission_registry.has_permission(request.user, cls.code)
 
 
 class OptionPermission(BasePermission):
-    """选项权限"""
+    """选项权限, 拥有 code_set 中任一权限即可"""
 
     code_set = set()
     message = '未添加操作权限'
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        permission_registry.reference(cls, *cls.code_set)
+
     def has_permission(self, request, view):
         if request.user.is_manager:
             return True
 
-        return self.code_list.isdisjoint(request.user.permissions)
+        return permission_registry.has_any_permission(request.user, self.code_set)
 
 
 __all__ = [
@@ -100,4 +208,5 @@ __all__ = [
     'FunctionPermission',
     'QueryPermission',
     'OptionPermission',
+    'permission_registry',
 ]
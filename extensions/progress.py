@@ -0,0 +1,116 @@
+import asyncio
+import os
+import threading
+import time
+
+
+class ChannelPublisher:
+    """常驻事件循环, 在后台线程中向 channel layer 发送消息
+
+    同一进程共用一个事件循环, channel layer 的 Redis 连接随事件循环复用, 不再每次发送都新建事件循环和连接.
+    事件循环在首次使用时创建, 按进程号区分, 兼容 Celery 的 prefork 子进程.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_loop(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='channel-publisher', daemon=True).start()
+                self._loop = loop
+                self._pid = os.getpid()
+            return self._loop
+
+    def submit(self, coroutine):
+        """提交协程到事件循环, 立即返回 concurrent.futures.Future"""
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self.get_loop())
+
+    def publish(self, consumer_class, user, data):
+        """提交发送, 立即返回 concurrent.futures.Future"""
+
+        return self.submit(consumer_class.send_data(user, data))
+
+    def send(self, consumer_class, user, data, timeout=5):
+        """发送并等待完成"""
+
+        return self.publish(consumer_class, user, data).result(timeout)
+
+
+channel_publisher = ChannelPublisher()
+
+
+class ProgressReporter:
+    """后台任务进度上报
+
+    update 只记录最新进度, 每秒最多发送 max_rate 次; 发送间隔内或上一次发送未完成时暂存最新进度, 由定时器在可以发送时补发,
+    期间的更新合并为最新一次. 上报开销与数据条数无关, 任务结束时调用 send 发送最终状态并等待完成, 上报失败不影响任务.
+    """
+
+    def __init__(self, consumer_class, user, max_rate=2):
+        self.consumer_class = consumer_class
+        self.user = user
+        self.interval = 1 / max_rate
+        self.last_time = None
+        self.future = None
+        self.pending_data = None
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def update(self, data):
+        with self.lock:
+            self.pending_data = data
+            self.flush()
+
+    def flush(self):
+        """发送暂存的进度, 无法发送时启动定时器稍后重试, 调用方持有锁"""
+
+        if self.pending_data is None:
+            return
+
+        now = time.monotonic()
+        delay = 0 if self.last_time is None else self.last_time + self.interval - now
+        if delay <= 0 and (self.future is None or self.future.done()):
+            self.last_time = now
+            self.future = channel_publisher.publish(self.consumer_class, self.user, self.pending_data)
+            self.pending_data = None
+            return
+
+        if self.timer is None:
+            self.timer = threading.Timer(max(delay, self.interval / 10), self.on_timer)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def on_timer(self):
+        with self.lock:
+            self.timer = None
+            self.flush()
+
+    def send(self, data, timeout=5):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.future is not None and not self.future.done():
+                self.future.cancel()
+
+            self.pending_data = None
+            self.last_time = time.monotonic()
+            self.future = None
+
+        try:
+            channel_publisher.send(self.consumer_class, self.user, data, timeout)
+        except Exception:
+            # 进度上报失败不影响任务结果
+            pass
+
+
+__all__ = [
+    'ChannelPublisher',
+    'channel_publisher',
+    'ProgressReporter',
+]
@@ -0,0 +1,206 @@
+import logging
+import random
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer, Serializer
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """查询数超出预算或存在 N+1 查询"""
+
+
+def query_budget(max_count):
+    """声明视图操作的查询预算"""
+
+    def decorator(func):
+        func.query_budget = max_count
+        return func
+
+    return decorator
+
+
+def should_audit():
+    """是否审计本次请求: raise 模式(测试)全部审计, sample 模式按比例抽样, off 关闭"""
+
+    mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+    if mode == 'raise':
+        return True
+    if mode == 'sample':
+        return random.random() < getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', 0)
+    return False
+
+
+def get_relation_lookup(model, source):
+    """返回 (关联查询路径, 是否多对多/反向关联, 关联模型), source 不是关联时返回 None"""
+
+    lookup_list = []
+    is_many = False
+    for name in source.split('.'):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+        if not field.is_relation:
+            return None
+
+        lookup_list.append(name)
+        is_many = is_many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    return '__'.join(lookup_list), is_many, model
+
+
+def infer_related_fields(serializer, prefix='', is_many=False):
+    """根据序列化器字段推断 select_related / prefetch_related 路径"""
+
+    select_related_set = set()
+    prefetch_related_set = set()
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None:
+        return select_related_set, prefetch_related_set
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        if isinstance(field, ManyRelatedField):
+            child_field = field.child_relation
+        elif isinstance(field, (BaseSerializer, RelatedField)):
+            child_field = field
+        else:
+            continue
+
+        # 单个主键字段直接读取外键列, 无需关联查询
+        if isinstance(child_field, PrimaryKeyRelatedField) and not isinstance(field, ManyRelatedField):
+            continue
+
+        if (relation := get_relation_lookup(model, field.source)) is None:
+            continue
+
+        lookup, field_is_many, _ = relation
+        lookup = f'{prefix}{lookup}'
+        field_is_many = is_many or field_is_many
+        if field_is_many:
+            prefetch_related_set.add(lookup)
+        else:
+            select_related_set.add(lookup)
+
+        if isinstance(field, BaseSerializer):
+            child_select_set, child_prefetch_set = infer_related_fields(field, f'{lookup}__', field_is_many)
+            # 预取路径下的外键只能随预取一起查询
+            if field_is_many:
+                prefetch_related_set |= child_select_set
+            else:
+                select_related_set |= child_select_set
+            prefetch_related_set |= child_prefetch_set
+
+    return select_related_set, prefetch_related_set
+
+
+class QueryAuditor:
+    """查询审计, 通过 connection.execute_wrapper 记录请求中的查询
+
+    相同 SQL 模板执行次数达到 n_plus_one_threshold 视为 N+1, 同时记录执行时所在的序列化器字段.
+    """
+
+    def __init__(self, n_plus_one_threshold=3):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.sql_counter = Counter()
+        self.sql_field_map = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.sql_counter[sql] += 1
+        if sql not in self.sql_field_map:
+            self.sql_field_map[sql] = self.get_current_field()
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.sql_counter.values())
+
+    @staticmethod
+    def get_current_field():
+        """从调用栈中查找正在序列化的字段, 返回 (字段路径, 关联查询路径建议)"""
+
+        field_list = []
+        frame = sys._getframe(2)
+        while frame is not None:
+            if frame.f_code.co_name == 'to_representation':
+                serializer = frame.f_locals.get('self')
+                field = frame.f_locals.get('field')
+                if isinstance(serializer, Serializer) and field is not None:
+                    field_list.append(field)
+            frame = frame.f_back
+
+        if not field_list:
+            return None
+
+        field_list.reverse()
+        field_path = '.'.join(field.field_name for field in field_list)
+
+        root = field_list[0].parent
+        if isinstance(root, ListSerializer):
+            root = root.child
+        model = getattr(getattr(root, 'Meta', None), 'model', None)
+        suggestion = None
+        if model is not None:
+            lookup_list = []
+            is_many = False
+            for field in field_list:
+                if (relation := get_relation_lookup(model, field.source)) is None:
+                    break
+                lookup, field_is_many, model = relation
+                lookup_list.append(lookup)
+                is_many = is_many or field_is_many
+            if lookup_list:
+                method = 'prefetch_related' if is_many else 'select_related'
+                suggestion = f"{method}('{'__'.join(lookup_list)}')"
+        return field_path, suggestion
+
+    def get_n_plus_one_list(self):
+        return [
+            (sql, count, *(self.sql_field_map.get(sql) or (None, None)))
+            for sql, count in self.sql_counter.items() if count >= self.n_plus_one_threshold
+        ]
+
+    def check(self, label, budget=None):
+        """检查审计结果, raise 模式下抛出异常, 否则记录警告日志"""
+
+        message_list = []
+        if budget is not None and self.count > budget:
+            message_list.append(f'{label} 查询 {self.count} 次, 超出预算 {budget} 次')
+
+        for sql, count, field_path, suggestion in self.get_n_plus_one_list():
+            message = f'{label} 存在 N+1 查询, 重复 {count} 次: {sql[:200]}'
+            if field_path:
+                message += f' | 字段: {field_path}'
+            if suggestion:
+                message += f' | 建议: {suggestion}'
+            message_list.append(message)
+
+        if not message_list:
+            return
+
+        if getattr(settings, 'QUERY_BUDGET_MODE', 'off') == 'raise':
+            raise QueryBudgetExceeded('\n'.join(message_list))
+
+        for message in message_list:
+            logger.warning(message)
+
+
+__all__ = [
+    'QueryBudgetExceeded',
+    'query_budget',
+    'should_audit',
+    'infer_related_fields',
+    'QueryAuditor',
+]
@@ -1,9 +1,21 @@
-from rest_framework.serializers import ModelSerializer
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.serializers import ModelSerializer, SerializerMethodField
 
 from extensions.exceptions import ValidationError
 
 
 class ModelSerializerEx(ModelSerializer):
+    """模型序列化器
+
+    支持稀疏字段集: fields 只保留指定字段, exclude 排除指定字段, id 始终保留.
+    """
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.only_fields = fields
+        self.exclude_fields = exclude
 
     @property
     def request(self):
@@ -13,6 +25,35 @@ class ModelSerializerEx(ModelSerializer):
     def user(self):
         return self.context['request'].user
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.only_fields:
+            fields = {name: field for name, field in fields.items() if name in self.only_fields or name == 'id'}
+        if self.exclude_fields:
+            fields = {name: field for name, field in fields.items() if name not in self.exclude_fields or name == 'id'}
+        return fields
+
+    def get_deferred_fields(self):
+        """返回序列化时不需要读取的模型字段, 字段来源无法确定(方法字段、属性等)时返回空列表"""
+
+        opts = self.Meta.model._meta
+        source_set = set()
+        for field in self.fields.values():
+            if field.source == '*' or isinstance(field, SerializerMethodField):
+                return []
+
+            source = field.source.split('.')[0]
+            if match := re.fullmatch(r'get_(\w+)_display', source):
+                source = match.group(1)
+
+            try:
+                opts.get_field(source)
+            except FieldDoesNotExist:
+                return []
+            source_set.add(source)
+
+        return [field.name for field in opts.concrete_fields if field.name not in source_set and not field.primary_key]
+
     def check_unique(self, queryset, fields, message):
         queryset = queryset.filter(**fields)
         if self.instance:
@@ -25,7 +66,9 @@ class ModelSerializerEx(ModelSerializer):
         pass
 
     def validate(self, attrs):
-        self.validate_unique(attrs)
+        # 批量导入时由导入引擎统一检查唯一约束
+        if not self.context.get('batch_import'):
+            self.validate_unique(attrs)
         return super().validate(attrs)
 
 
@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+# 归档查询集批量删除后发送, 参数: sender(模型类), pk_list(本次删除的数据 ID 列表)
+archive_deleted = Signal()
+
+# 归档查询集批量恢复后发送, 参数: sender(模型类), pk_list(本次恢复的数据 ID 列表)
+archive_restored = Signal()
+
+
+__all__ = [
+    'archive_deleted',
+    'archive_restored',
+]
@@ -0,0 +1,63 @@
+from django.utils.module_loading import autodiscover_modules
+
+
+class Column:
+    """导出列, field 为 values() 可用的字段路径"""
+
+    def __init__(self, field, label):
+        self.field = field
+        self.label = label
+
+    def export_value(self, value):
+        return value
+
+
+class BooleanColumn(Column):
+    """布尔列, 导出为文字"""
+
+    def __init__(self, field, label, true_label='是', false_label='否'):
+        super().__init__(field, label)
+        self.true_label = true_label
+        self.false_label = false_label
+
+    def export_value(self, value):
+        return self.true_label if value else self.false_label
+
+
+class ChoiceColumn(Column):
+    """选项列, 导出为选项名称"""
+
+    def __init__(self, field, label, choices):
+        super().__init__(field, label)
+        self.choice_map = dict(choices)
+
+    def export_value(self, value):
+        return self.choice_map.get(value, value)
+
+
+class DataTransferRegistry:
+    """导入导出视图注册表, 按数据模型查找视图"""
+
+    def __init__(self):
+        self.viewset_map = {}
+
+    def register(self, viewset_class):
+        self.viewset_map[viewset_class.data_model] = viewset_class
+
+    def get_viewset(self, data_model):
+        # Celery worker 不加载路由, 首次查找时导入各应用的视图模块
+        if data_model not in self.viewset_map:
+            autodiscover_modules('views')
+        return self.viewset_map[data_model]
+
+
+data_transfer_registry = DataTransferRegistry()
+
+
+__all__ = [
+    'Column',
+    'BooleanColumn',
+    'ChoiceColumn',
+    'DataTransferRegistry',
+    'data_transfer_registry',
+]
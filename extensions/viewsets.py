@@ -1,9 +1,14 @@
+import uuid
+
+from celery.result import AsyncResult
+from django.db import connection, transaction
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from django_tenants.utils import get_tenant, schema_context
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.filters import OrderingFilter
 from rest_framework.mixins import (
     CreateModelMixin,
     DestroyModelMixin,
@@ -14,9 +19,25 @@ from rest_framework.mixins import (
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ViewSet
 
+from apps.system.models import NumberRegistry
+from apps.task.models import ExportTask, ImportTask
+from apps.task.tasks import export_data_task, import_data_task
 from extensions.exceptions import ValidationError
+from extensions.exporters import ExportEngine
+from extensions.field_configs import get_model_field_schema
+from extensions.filters import SearchFilterEx
+from extensions.importers import ImportEngine
+from extensions.models import ArchiveQuerySet
 from extensions.paginations import PageNumberPaginationEx
-from extensions.schemas import InstanceListRequest
+from extensions.query_budgets import QueryAuditor, infer_related_fields, should_audit
+from extensions.schemas import (
+    ExportTaskResponse,
+    ImportRequest,
+    ImportTaskResponse,
+    InstanceListRequest,
+)
+from extensions.serializers import ModelSerializerEx
+from extensions.transfers import data_transfer_registry
 
 
 class FunctionViewSet(ViewSet):
@@ -37,11 +58,15 @@ class FunctionViewSet(ViewSet):
 
 class GenericViewSetEx(GenericViewSet):
     pagination_class = PageNumberPaginationEx
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilterEx, OrderingFilter]
     ordering_fields = ['id']
     ordering = ['-id']
     select_related_fields = []
     prefetch_related_fields = []
+    action_permission_map = {}
+    sparse_field_actions = ['list', 'retrieve']
+    auto_related_fields = False
+    query_budget = {}
 
     @property
     def user(self):
@@ -55,12 +80,76 @@ class GenericViewSetEx(GenericViewSet):
     def context(self):
         return self.get_serializer_context()
 
+    def get_permissions(self):
+        # 通用操作(如导入导出)按视图声明的权限类校验
+        if (permission_classes := self.action_permission_map.get(self.action)) is not None:
+            return [permission() for permission in permission_classes]
+        return super().get_permissions()
+
+    def get_sparse_fields(self):
+        """解析稀疏字段集参数 ?fields= / ?exclude=, 只用于查询操作"""
+
+        if self.action not in self.sparse_field_actions or not issubclass(self.get_serializer_class(), ModelSerializerEx):
+            return {}
+
+        sparse_fields = {}
+        for param in ('fields', 'exclude'):
+            if value := self.request.query_params.get(param):
+                sparse_fields[param] = {name.strip() for name in value.split(',') if name.strip()}
+        return sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request is not None:
+            kwargs = {**self.get_sparse_fields(), **kwargs}
+        return super().get_serializer(*args, **kwargs)
+
+    def get_related_fields(self):
+        """返回 (select_related 路径, prefetch_related 路径), 开启 auto_related_fields 时合并根据序列化器推断的路径"""
+
+        select_related_fields = list(self.select_related_fields)
+        prefetch_related_fields = list(self.prefetch_related_fields)
+        if self.auto_related_fields and self.request is not None and self.action in self.sparse_field_actions:
+            select_related_set, prefetch_related_set = infer_related_fields(self.get_serializer())
+            select_related_fields += sorted(select_related_set - set(select_related_fields))
+            prefetch_related_fields += sorted(prefetch_related_set - set(prefetch_related_fields))
+        return select_related_fields, prefetch_related_fields
+
     def get_queryset(self):
+        select_related_fields, prefetch_related_fields = self.get_related_fields()
         queryset = super().get_queryset()
-        queryset = queryset.select_related(*self.select_related_fields)
-        queryset = queryset.prefetch_related(*self.prefetch_related_fields)
+        # select_related() 不带参数时会关联全部非空外键
+        if select_related_fields:
+            queryset = queryset.select_related(*select_related_fields)
+        if prefetch_related_fields:
+            queryset = queryset.prefetch_related(*prefetch_related_fields)
+
+        # 查询操作只读取序列化需要的列
+        if self.request is not None and self.action in self.sparse_field_actions and \
+                issubclass(self.get_serializer_class(), ModelSerializerEx):
+            related_field_set = {field.split('__')[0] for field in [*select_related_fields, *prefetch_related_fields]}
+            deferred_fields = [field for field in self.get_serializer().get_deferred_fields() if field not in related_field_set]
+            if deferred_fields:
+                queryset = queryset.defer(*deferred_fields)
         return queryset
 
+    def get_query_budget(self):
+        """查询预算, 优先使用操作方法上 @query_budget 声明的值, 其次为视图的 query_budget[action]"""
+
+        if (budget := getattr(getattr(self, self.action or '', None), 'query_budget', None)) is not None:
+            return budget
+        return self.query_budget.get(self.action)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not should_audit():
+            return super().dispatch(request, *args, **kwargs)
+
+        query_auditor = QueryAuditor()
+        with connection.execute_wrapper(query_auditor):
+            response = super().dispatch(request, *args, **kwargs)
+
+        query_auditor.check(f'{self.__class__.__name__}.{self.action}', self.get_query_budget())
+        return response
+
 
 class ListViewSet(GenericViewSetEx, ListModelMixin):
     """列表视图"""
@@ -94,7 +183,15 @@ class ModelViewSetEx(QueryViewSet, CreateModelMixin, UpdateModelMixin, DestroyMo
 
 
 class ArchiveViewSet(QueryViewSet, CreateModelMixin, UpdateModelMixin, DestroyModelMixin, BatchDestroyModelMixin):
-    """归档视图"""
+    """归档视图
+
+    列表默认只查询未删除数据, 请求参数包含 is_deleted 时按参数过滤(回收站).
+    """
+
+    def filter_queryset(self, queryset):
+        if self.action == 'list' and 'is_deleted' not in self.request.query_params:
+            queryset = queryset.live()
+        return super().filter_queryset(queryset)
 
     def perform_update(self, serializer):
         if serializer.instance.is_deleted:
@@ -106,39 +203,227 @@ class ArchiveViewSet(QueryViewSet, CreateModelMixin, UpdateModelMixin, DestroyMo
     def undo_destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         if instance.is_deleted:
-            serializer = self.get_serializer(instance)
-            serializer.validate_unique(serializer.data)
-            instance.undo_delete()
+            self.perform_batch_undo_destroy(self.get_queryset().filter(pk=instance.pk))
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @extend_schema(request=InstanceListRequest, responses={204: None})
+    @action(detail=False, methods=['delete'])
+    def batch_undo_destroy(self, request, *args, **kwargs):
+        serializer = InstanceListRequest(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        validated_data = serializer.validated_data
 
+        instance_set = self.get_queryset().filter(id__in=validated_data['ids'])
+        self.perform_batch_undo_destroy(instance_set)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def perform_batch_undo_destroy(self, instance_set):
+        count, conflict_list = instance_set.undo_delete()
+        if conflict_list:
+            model = instance_set.model
+            message_map = {}
+            for field_group, row in conflict_list:
+                label = '/'.join(str(model._meta.get_field(field).verbose_name) for field in field_group)
+                value = '/'.join(str(row[field]) for field in field_group)
+                message_map.setdefault(label, []).append(value)
+            raise ValidationError(', '.join(f'该{label}已被使用: {"; ".join(values)}' for label, values in message_map.items()))
+        return count
+
 
 class ExportModelMixin:
-    """"""
+    """导出数据
+
+    子类声明 data_model、export_columns 和 export_permission_classes, 导出由通用任务 export_data_task 在后台执行.
+    """
+
+    data_model = None
+    export_columns = []
+    export_permission_classes = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.data_model is not None:
+            cls.action_permission_map = {
+                **cls.action_permission_map,
+                'export_data': cls.export_permission_classes,
+                'cancel_export': cls.export_permission_classes,
+            }
+            data_transfer_registry.register(cls)
+
+    @classmethod
+    def get_export_engine(cls, id_list, progress_callback=None):
+        model = cls.queryset.model
+        field_list = list(dict.fromkeys(['id', *(column.field for column in cls.export_columns)]))
+
+        model_field_schema = None
+        if any(field.name == 'extension_data' for field in model._meta.concrete_fields):
+            model_field_schema = get_model_field_schema(cls.data_model)
+            field_list.append('extension_data')
+
+        def transform(row_list):
+            item_list = [
+                {column.label: column.export_value(row[column.field]) for column in cls.export_columns}
+                for row in row_list
+            ]
+            if model_field_schema is not None:
+                for item, extension_item in zip(item_list, model_field_schema.export_list(
+                        row['extension_data'] for row in row_list)):
+                    item.update(extension_item)
+            return item_list
+
+        return ExportEngine(model.objects.values(*field_list), transform, id_list=id_list,
+                            progress_callback=progress_callback)
+
+    def get_export_queryset(self):
+        queryset = self.get_queryset()
+        if isinstance(queryset, ArchiveQuerySet):
+            queryset = queryset.live()
+        return queryset
 
-    @extend_schema(responses={204: None})
+    def check_exporting(self):
+        if ExportTask.objects.filter(
+                model=self.data_model, status=ExportTask.ExportStatus.EXPORTING, creator=self.user).exists():
+            raise ValidationError('导出任务正在进行中')
+
+    @extend_schema(request=InstanceListRequest, responses={200: ExportTaskResponse})
     @action(detail=False, methods=['get', 'post'])
+    @transaction.atomic
     def export_data(self, request, *args, **kwargs):
         """导出数据"""
 
-        if request.methods == 'GET':
-            instance_ids = self.filter_queryset(self.get_queryset()).values_list('id', flat=True)
-        elif request.methods == 'POST':
+        self.check_exporting()
+        queryset = self.get_export_queryset()
+        if request.method == 'GET':
+            instance_ids = list(self.filter_queryset(queryset).values_list('id', flat=True))
+        elif request.method == 'POST':
             serializer = InstanceListRequest(data=request.data)
             serializer.is_valid(raise_exception=True)
             validated_data = serializer.validated_data
-
-            instance_ids = validated_data['ids']
-            if self.get_queryset().filter(id__in=instance_ids).count() != len(instance_ids):
-                raise ValidationError('导出数据不存在')
+            # 只导出查询范围内的数据(未删除、授权仓库内), 保持请求中的顺序
+            allowed_id_set = set(queryset.filter(id__any=validated_data['ids']).values_list('id', flat=True))
+            instance_ids = [instance_id for instance_id in dict.fromkeys(validated_data['ids'])
+                            if instance_id in allowed_id_set]
         else:
             raise ValidationError('导出数据错误')
-        # 导出中能否进行增删改
+
+        if len(instance_ids) == 0:
+            raise ValidationError('导出数据为空')
+
+        export_task_number = NumberRegistry.generate_number('EX', NumberRegistry.DataModel.EXPORT_TASK)
+        celery_task_number = str(uuid.uuid4())
+        export_task = ExportTask.objects.create(
+            number=export_task_number,
+            model=self.data_model,
+            export_id_list=instance_ids,
+            celery_task_number=celery_task_number,
+            creator=self.user,
+        )
+
+        tenant_id = self.tenant.id
+        transaction.on_commit(lambda: export_data_task.apply_async(
+            args=(tenant_id, export_task.id), task_id=celery_task_number))
+        return Response(data={'number': export_task_number}, status=status.HTTP_200_OK)
+
+    @extend_schema(responses={204: None})
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def cancel_export(self, request, *args, **kwargs):
+        """取消导出"""
+
+        if not (export_task := ExportTask.objects.filter(
+                model=self.data_model, status=ExportTask.ExportStatus.EXPORTING, creator=self.user).first()):
+            raise ValidationError('导出任务不存在')
+
+        async_result = AsyncResult(export_task.celery_task_number)
+        async_result.revoke(terminate=True)
+
+        export_task.status = ExportTask.ExportStatus.CANCELLED
+        export_task.duration = (timezone.localtime() - export_task.create_time).total_seconds()
+        export_task.save(update_fields=['status', 'duration'])
+
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class ImportModelMixin:
-    """"""
+    """导入数据
+
+    子类声明 data_model、number_prefix 和 import_permission_classes, 导入由通用任务 import_data_task 在后台执行,
+    数据使用视图的序列化器校验, 要求同 ImportEngine.
+    """
+
+    data_model = None
+    number_prefix = None
+    import_permission_classes = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.data_model is not None:
+            cls.action_permission_map = {
+                **cls.action_permission_map,
+                'import_data': cls.import_permission_classes,
+                'cancel_import': cls.import_permission_classes,
+            }
+            data_transfer_registry.register(cls)
+
+    @classmethod
+    def get_import_engine(cls, progress_callback=None):
+        def number_generator(count):
+            return NumberRegistry.generate_serial_number_list(cls.number_prefix, cls.data_model, count)
+
+        return ImportEngine(cls.queryset.model, cls.serializer_class, number_generator,
+                            progress_callback=progress_callback)
+
+    def check_importing(self):
+        if ImportTask.objects.filter(model=self.data_model, status=ImportTask.ImportStatus.IMPORTING).exists():
+            raise ValidationError('导入任务正在进行中')
+
+    @extend_schema(request=ImportRequest, responses={200: ImportTaskResponse})
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def import_data(self, request, *args, **kwargs):
+        """导入数据"""
+
+        self.check_importing()
+        serializer = ImportRequest(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        validated_data = serializer.validated_data
+
+        import_file = validated_data['import_file']
+        import_task_number = NumberRegistry.generate_number('IM', NumberRegistry.DataModel.IMPORT_TASK)
+        celery_task_number = str(uuid.uuid4())
+        import_task = ImportTask.objects.create(
+            number=import_task_number,
+            model=self.data_model,
+            celery_task_number=celery_task_number,
+            creator=self.user,
+        )
+        file_path = f'{self.tenant.number}/import_file/{import_task_number}.json'
+        import_task.import_file.save(file_path, import_file, save=True)
+
+        tenant_id = self.tenant.id
+        transaction.on_commit(lambda: import_data_task.apply_async(
+            args=(tenant_id, import_task.id), task_id=celery_task_number))
+        return Response(data={'number': import_task_number}, status=status.HTTP_200_OK)
+
+    @extend_schema(responses={204: None})
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def cancel_import(self, request, *args, **kwargs):
+        """取消导入"""
+
+        if not (import_task := ImportTask.objects.filter(
+                model=self.data_model, status=ImportTask.ImportStatus.IMPORTING, creator=self.user).first()):
+            raise ValidationError('导入任务不存在')
+
+        async_result = AsyncResult(import_task.celery_task_number)
+        async_result.revoke(terminate=True)
+
+        import_task.status = ImportTask.ImportStatus.CANCELLED
+        import_task.duration = (timezone.localtime() - import_task.create_time).total_seconds()
+        import_task.save(update_fields=['status', 'duration'])
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 __all__ = [
@@ -18,8 +18,9 @@ django_asgi_app = get_asgi_application()
 
 
 def get_websocket_application():
+    from apps.product.consumers import InventoryProvisionConsumer
     from apps.system.consumers import NotificationConsumer
-    from apps.task.consumers import ExportTaskConsumer
+    from apps.task.consumers import ExportTaskConsumer, ImportTaskConsumer
     from extensions.middlewares import WebSocketAuthMiddleware
 
     return AllowedHostsOriginValidator(
@@ -27,6 +28,8 @@ def get_websocket_application():
             URLRouter([
                 path("ws/notifications/", NotificationConsumer.as_asgi()),
                 path("ws/export_tasks/", ExportTaskConsumer.as_asgi()),
+                path("ws/import_tasks/", ImportTaskConsumer.as_asgi()),
+                path("ws/inventory_provisions/", InventoryProvisionConsumer.as_asgi()),
             ])
         )
     )
@@ -5,7 +5,7 @@ from django.db import transaction
 from django.utils import timezone
 from django_tenants.utils import tenant_context
 
-from apps.system.models import User
+from apps.system.models import NumberRegistry, User
 from apps.tenant.models import Domain, Tenant
 
 
@@ -21,5 +21,6 @@ def run():
         Domain.objects.create(domain=domain_name, tenant=tenant)
 
         with tenant_context(tenant):
+            number = NumberRegistry.generate_serial_number('U', NumberRegistry.DataModel.USER)
             User.objects.create(
-                number="U001", username=username, password=make_password(username), name=username, is_manager=True)
+                number=number, username=username, password=make_password(username), name=username, is_manager=True)